@@ -0,0 +1,157 @@
+import math
+import os
+import sys
+import time
+
+import catalog
+import db
+
+# ✅ Cross-interview score analytics
+# score_stats keeps running sums (n, sum, sum of squares, rule-vs-LLM
+# comparisons) per dimension and key, and score_hist the score distribution
+# in SCORE_BUCKET-wide buckets. Both are updated by record() inside the same
+# transaction as the response insert, grade or regrade that changes a score,
+# so reading them is O(#questions) instead of a scan over every response.
+# Dimensions: "all" (key "all"), "question" (question id), "qtype", "difficulty".
+# `python analytics.py rebuild` recomputes everything from the responses table.
+ANALYTICS_DISAGREE_GAP = float(os.environ.get("ANALYTICS_DISAGREE_GAP", "2"))
+SCORE_BUCKET = 0.5
+MAX_SCORE = 5.0
+
+
+def _keys(question_id):
+    q = catalog.current().get(question_id)
+    return (
+        ("all", "all"),
+        ("question", str(question_id)),
+        ("qtype", q.qtype if q else "unknown"),
+        ("difficulty", str(q.difficulty) if q and q.difficulty is not None else "unknown"),
+    )
+
+
+def _bucket(score):
+    return min(int(MAX_SCORE / SCORE_BUCKET), max(0, int(score / SCORE_BUCKET)))
+
+
+def record(cur, rows, sign=1):
+    """Add (sign=1) or remove (sign=-1) ``(question_id, score, rule_score, llm_score)`` rows.
+
+    Runs in the caller's transaction.
+    """
+    stats, hist = [], []
+    for question_id, score, rule_score, llm_score in rows:
+        if score is None:
+            continue
+        compared = rule_score is not None and llm_score is not None
+        disagreed = compared and abs(rule_score - llm_score) >= ANALYTICS_DISAGREE_GAP
+        for dim, key in _keys(question_id):
+            stats.append((dim, key, sign, sign * score, sign * score * score, sign * compared, sign * disagreed))
+            hist.append((dim, key, _bucket(score), sign))
+    cur.executemany(
+        """
+        INSERT INTO score_stats (dim,key,n,total,total_sq,compared,disagreed) VALUES (?,?,?,?,?,?,?)
+        ON CONFLICT(dim, key) DO UPDATE SET
+            n=n+excluded.n, total=total+excluded.total, total_sq=total_sq+excluded.total_sq,
+            compared=compared+excluded.compared, disagreed=disagreed+excluded.disagreed
+        """,
+        stats,
+    )
+    cur.executemany(
+        """
+        INSERT INTO score_hist (dim,key,bucket,n) VALUES (?,?,?,?)
+        ON CONFLICT(dim, key, bucket) DO UPDATE SET n=n+excluded.n
+        """,
+        hist,
+    )
+
+
+def rebuild(cur, chunk=2000):
+    """Recompute both tables from the scored responses, in the caller's transaction."""
+    cur.execute("DELETE FROM score_stats")
+    cur.execute("DELETE FROM score_hist")
+    read = cur.connection.cursor()
+    read.execute(
+        "SELECT question_id, score, rule_score, llm_score FROM responses WHERE COALESCE(status, 'scored') != 'pending'"
+    )
+    total = 0
+    while True:
+        rows = read.fetchmany(chunk)
+        if not rows:
+            return total
+        record(cur, [tuple(r) for r in rows])
+        total += len(rows)
+
+
+def _summarize(row, buckets):
+    n = row["n"]
+    mean = row["total"] / n if n else None
+    variance = max(0.0, row["total_sq"] / n - mean * mean) if n else None
+    return {
+        "answered": n,
+        "mean": round(mean, 3) if n else None,
+        "variance": round(variance, 3) if n else None,
+        "stddev": round(math.sqrt(variance), 3) if n else None,
+        "compared": row["compared"],
+        "disagreement_rate": round(row["disagreed"] / row["compared"], 3) if row["compared"] else None,
+        # Lower bucket edge -> count
+        "histogram": {f"{b * SCORE_BUCKET:g}": c for b, c in sorted(buckets.items()) if c},
+    }
+
+
+def load(dims):
+    """``{dim: {key: summary}}`` for the given dimensions."""
+    marks = ",".join("?" * len(dims))
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT dim, key, bucket, n FROM score_hist WHERE dim IN ({marks})", dims)
+        hist = {}
+        for r in cur.fetchall():
+            hist.setdefault((r["dim"], r["key"]), {})[r["bucket"]] = r["n"]
+        cur.execute(f"SELECT * FROM score_stats WHERE dim IN ({marks}) AND n > 0", dims)
+        rows = cur.fetchall()
+    result = {dim: {} for dim in dims}
+    for r in rows:
+        result[r["dim"]][r["key"]] = _summarize(r, hist.get((r["dim"], r["key"]), {}))
+    return result
+
+
+def overview():
+    data = load(("all", "qtype", "difficulty"))
+    return {
+        "overall": data["all"].get("all"),
+        "by_qtype": data["qtype"],
+        "by_difficulty": data["difficulty"],
+    }
+
+
+def by_question():
+    cat = catalog.current()
+    per_question = load(("question",))["question"]
+    out = []
+    for key, summary in per_question.items():
+        q = cat.get(int(key))
+        out.append(dict(
+            summary,
+            question_id=int(key),
+            question=q.text if q else None,
+            qtype=q.qtype if q else None,
+            difficulty=q.difficulty if q else None,
+        ))
+    # Hardest questions first
+    return sorted(out, key=lambda s: s["mean"])
+
+
+# python analytics.py rebuild  -> recompute the aggregates from the responses table
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python analytics.py rebuild")
+    import db_init
+
+    db_init.init_db()
+    started = time.perf_counter()
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        n = rebuild(cur)
+        conn.commit()
+    print(f"✅ analytics rebuilt from {n} responses in {time.perf_counter() - started:.2f} s")
@@ -1,28 +1,47 @@
+import asyncio
 import os
-import sqlite3
 import time
 import uuid
 import json
 import re
+import sqlite3
+import tempfile
+
+from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException, Form
+from fastapi import FastAPI, HTTPException, Form, Header, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from dotenv import load_dotenv
-from groq import Client
 
-# Load environment variables
-load_dotenv()
-GROQ_KEY = os.environ.get("GROQ_API_KEY")
-client = Client(api_key=GROQ_KEY)
+import analytics
+import catalog
+import db
+import db_init
+import evaluator_store
+import formula
+import llm
+import metrics
+import pdf_report
+import profiler
+import reports
+import running_summary
+import scoring_worker
+import similarity
+import storage
+import verdict_cache
+import workbook
+import write_queue
 
 app = FastAPI()
-DB = os.path.join(os.path.dirname(__file__), "interviews.db")
-
-
-def get_conn():
-    conn = sqlite3.connect(DB)
-    conn.row_factory = sqlite3.Row
-    return conn
+# "inline" grades before /responses returns; "deferred" queues grading for workers
+SCORING_MODE = os.environ.get("SCORING_MODE", "inline")
+REPORT_PENDING_WAIT = float(os.environ.get("REPORT_PENDING_WAIT", "10"))
+# Answers packed into one LLM request, and parallel requests, for batch grading
+GRADE_PACK_SIZE = int(os.environ.get("GRADE_PACK_SIZE", "8"))
+GRADE_BATCH_CONCURRENCY = int(os.environ.get("GRADE_BATCH_CONCURRENCY", "4"))
+# Rough prompt budget (tokens) when a full transcript is requested (?transcript=true)
+REPORT_TOKEN_BUDGET = int(os.environ.get("REPORT_TOKEN_BUDGET", "3000"))
 
 
 class CreateInterview(BaseModel):
@@ -32,54 +51,149 @@ class CreateInterview(BaseModel):
     course: str
 
 
-# ✅ Health check
+class BatchItem(BaseModel):
+    question_id: int
+    response_text: str
+
+
+class BatchResponses(BaseModel):
+    interview_id: str
+    items: List[BatchItem]
+
+
+# ✅ Health check (liveness only; answers as soon as the process is up)
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
 
-# ✅ DB initialization
+# ✅ Readiness: 200 once warm-up (catalog, LLM client) has finished
+warm = {"catalog": False, "similarity": False, "llm": False}
+
+
+@app.get("/ready")
+def ready_check():
+    if not all(warm.values()):
+        return JSONResponse({"status": "warming", **warm}, status_code=503)
+    return {"status": "ready", **warm}
+
+
+# ✅ LLM verdict cache counters
+@app.get("/cache/stats")
+def cache_stats():
+    return verdict_cache.snapshot()
+
+
+# ✅ Connection pool metrics
+@app.get("/db/stats")
+def db_stats():
+    return db.snapshot()
+
+
+# ✅ Prometheus scrape endpoint
+metrics.gauges("verdict_cache", verdict_cache.snapshot)
+metrics.gauges("db_pool", db.snapshot)
+metrics.gauges("llm_gateway", llm.snapshot)
+metrics.gauges("similarity", similarity.snapshot)
+metrics.gauges("write_queue", write_queue.snapshot)
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# ✅ Per-route latency/status metrics and the optional per-request profiler
+@app.middleware("http")
+async def observe_requests(request, call_next):
+    sampler = profiler.for_request(request.headers)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        # Route template, not the raw path, keeps label cardinality bounded
+        route = request.scope.get("route")
+        path = route.path if route else "unmatched"
+        metrics.HTTP_SECONDS.observe(request.method, path, value=time.perf_counter() - started)
+        metrics.HTTP_REQUESTS.inc(request.method, path, str(status))
+        if sampler:
+            await run_in_threadpool(sampler.stop)
+    if sampler:
+        response.headers["X-Profile-File"] = await run_in_threadpool(sampler.write, f"{request.method} {path}")
+    return response
+
+
+async def warm_up():
+    try:
+        await run_in_threadpool(catalog.current)
+        warm["catalog"] = True
+        await run_in_threadpool(similarity.load)
+        warm["similarity"] = True
+        # Imports the groq SDK and builds the client off the request path
+        await run_in_threadpool(llm.client)
+        warm["llm"] = True
+    except Exception as e:
+        print("⚠️ warm-up failed:", e)
+
+
+async def save_similarity_index():
+    while True:
+        await asyncio.sleep(similarity.SIMILARITY_SAVE_INTERVAL)
+        await run_in_threadpool(similarity.save)
+
+
+# ✅ DB initialization (no-op when PRAGMA user_version is current) and warm-up
 @app.on_event("startup")
-def startup():
-    import db_init
+async def startup():
     db_init.init_db()
+    if storage.STORAGE_BACKEND != "sqlite" and SCORING_MODE == "deferred":
+        raise RuntimeError("SCORING_MODE=deferred needs STORAGE_BACKEND=sqlite")
+    # The databases backend creates its tables and installs the question catalog
+    await storage.backend().start()
+    app.state.warm_up = asyncio.get_running_loop().create_task(warm_up())
+    app.state.similarity_saver = asyncio.get_running_loop().create_task(save_similarity_index())
+    # SCORE_WORKERS=0 when a separate `python scoring_worker.py` process does the grading
+    if SCORING_MODE == "deferred" and scoring_worker.SCORE_WORKERS > 0:
+        scoring_worker.start(grade_response)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await scoring_worker.stop()
+    await run_in_threadpool(write_queue.stop)
+    await storage.backend().stop()
+    app.state.similarity_saver.cancel()
+    similarity.save()
+    pdf_report.shutdown()
+    workbook.shutdown()
+    db.close_all()
+
+
+# ✅ Lock contention surfaces as a retryable 503 instead of a bare 500
+@app.exception_handler(sqlite3.OperationalError)
+async def sqlite_operational_error(request, exc):
+    if "locked" in str(exc) or "busy" in str(exc):
+        return JSONResponse({"detail": "database is locked"}, status_code=503, headers={"Retry-After": "1"})
+    return JSONResponse({"detail": "database error"}, status_code=500)
 
 
 # ✅ Create interview
 @app.post("/interviews")
-def create_interview(payload: CreateInterview):
-    conn = get_conn()
-    cur = conn.cursor()
+async def create_interview(payload: CreateInterview):
     interview_id = str(uuid.uuid4())
     now = int(time.time())
 
-    cur.execute(
-        "INSERT INTO candidates (name,email,started_at) VALUES (?,?,?)",
-        (payload.candidate_name, payload.candidate_email, now),
-    )
-    candidate_id = cur.lastrowid
-
-    cur.execute(
-        "INSERT INTO interviews (id,candidate_id,status,created_at,current_question_idx) VALUES (?,?,?,?,?)",
-        (interview_id, candidate_id, "in_progress", now, 0),
-    )
-
-    conn.commit()
-    conn.close()
+    with metrics.stage("db_insert"):
+        await storage.backend().create_interview(interview_id, payload.candidate_name, payload.candidate_email, now)
     return {"interview_id": interview_id}
 
 
-# ✅ Get Question by index
+# ✅ Get Question by index (served from the in-memory catalog)
 @app.get("/questions/{idx}")
 def get_question(idx: int):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT * FROM questions ORDER BY difficulty, id LIMIT 1 OFFSET ?",
-        (idx,),
-    )
-    q = cur.fetchone()
-    conn.close()
+    q = catalog.current().at(idx)
 
     # Fallback: Static questions if DB is empty
     if not q:
@@ -92,7 +206,28 @@ def get_question(idx: int):
             return static_questions[idx]
         return {"id": idx, "text": "No more questions."}
 
-    return dict(q)
+    return q.as_dict()
+
+
+# ✅ Server-side interview cursor: each call serves the next unasked question
+# (order set by QUESTION_ORDER, see question_order.py) and advances
+# interviews.current_question_idx atomically.
+async def advance_interview(interview_id):
+    with metrics.stage("question_lookup"):
+        cat = await run_in_threadpool(catalog.current)
+    with metrics.stage("cursor_advance"):
+        served = await storage.backend().advance_cursor(interview_id, cat)
+    if served is None:
+        raise HTTPException(status_code=404, detail="Interview not found")
+    position, q = served
+    if q is None:
+        return {"id": None, "text": "No more questions.", "position": position, "done": True}
+    return dict(q.as_dict(), position=position, done=False)
+
+
+@app.get("/interviews/{interview_id}/next")
+async def next_question(interview_id: str):
+    return await advance_interview(interview_id)
 
 
 # ✅ Rule-based evaluation
@@ -104,14 +239,25 @@ def simple_rule_eval(question_row, response_text):
     if qtype == "formula":
         a = re.sub(r"\s+", "", response_text.lower())
         e = re.sub(r"\s+", "", expected.lower())
+        # load_question (on the threadpool) brings the catalog's precompiled AST along
+        if "formula" in question_row:
+            compiled = question_row["formula"]
+        else:
+            compiled = formula.compile_expected(expected)
         if e and a == e:
             score = 5.0
             details["match"] = "exact"
+            details["confident"] = True
+        elif compiled and formula.equivalent(compiled, response_text):
+            score = 5.0
+            details["match"] = "equivalent"
+            details["confident"] = True
         else:
             funcs = re.findall(r"([A-Z]{2,})\(", expected.upper())
             hit = sum(1 for f in funcs if f.lower() in response_text.lower())
             score = min(5.0, (hit / max(1, len(funcs))) * 4.0)
             details["func_hits"] = hit
+        details["score"] = round(score, 2)
     else:
         score = 0.0
         details["note"] = "no rule-based score"
@@ -120,8 +266,12 @@ def simple_rule_eval(question_row, response_text):
 
 
 # ✅ LLM evaluation
-def llm_score(question_text, expected_answer, candidate_answer):
-    if not GROQ_KEY:
+# Bump when the llm_score prompt changes so cached verdicts are not reused
+LLM_PROMPT_VERSION = "v1"
+
+
+async def llm_score(question_text, expected_answer, candidate_answer, priority="live"):
+    if not llm.enabled():
         return None, {"error": "no_groq_key"}
 
     prompt = f"""
@@ -134,112 +284,422 @@ Return JSON only: {{"score": number, "rationale": "short explanation"}}
 """
 
     try:
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instruct",
-            messages=[{"role": "user", "content": prompt}],
-            max_output_tokens=250,
-            temperature=0.0,
-        )
-        text = response.choices[0].message["content"].strip()
+        text = await llm.chat(prompt, max_tokens=250, temperature=0.0, priority=priority)
         m = re.search(r'"?score"?\s*[:=]\s*([0-9]+(\.[0-9]+)?)', text)
         score = float(m.group(1)) if m else None
+        if score is None:
+            metrics.LLM_ERRORS.inc("unparseable_reply")
         return score, {"raw": text}
     except Exception as e:
-        return None, {"error": str(e)}
+        return None, {"error": str(e) or type(e).__name__}
+
+
+async def llm_score_batch(question_text, expected_answer, candidate_answers, priority="live"):
+    """Score several answers to one question in a single LLM call.
+
+    Returns one ``(score, details)`` pair per answer, in order.
+    """
+    if not llm.enabled():
+        return [(None, {"error": "no_groq_key"})] * len(candidate_answers)
+
+    numbered = "\n".join(f"[{i}] {a}" for i, a in enumerate(candidate_answers, 1))
+    prompt = f"""
+You are an interviewer. Score each candidate answer below from 0 (poor) to 5 (excellent).
+Question: {question_text}
+Model answer: {expected_answer}
+Candidate answers:
+{numbered}
+
+Return JSON only, one entry per answer: [{{"id": number, "score": number, "rationale": "short explanation"}}]
+"""
+
+    text = None
+    try:
+        text = await llm.chat(prompt, max_tokens=60 + 80 * len(candidate_answers), temperature=0.0, priority=priority)
+        verdicts = {int(v["id"]): v for v in json.loads(re.search(r"\[.*\]", text, re.S).group(0))}
+    except Exception as e:
+        if text is not None:
+            metrics.LLM_ERRORS.inc("unparseable_reply")
+        return [(None, {"error": str(e) or type(e).__name__})] * len(candidate_answers)
+
+    results = []
+    for i in range(1, len(candidate_answers) + 1):
+        v = verdicts.get(i)
+        try:
+            results.append((float(v["score"]), {"raw": json.dumps(v), "batch": len(candidate_answers)}))
+        except (TypeError, KeyError, ValueError):
+            results.append((None, {"error": "missing_in_batch"}))
+    return results
+
+
+def load_question(question_id):
+    """Question fields plus its compiled model formula; reads the catalog, so call it off the event loop."""
+    q = catalog.current().get(question_id)
+    if q is None:
+        return {"id": question_id, "text": "N/A", "expected_answer": "", "qtype": "explain", "formula": None}
+    return dict(q.as_dict(), formula=q.formula)
+
+
+def load_questions(question_ids):
+    return [load_question(question_id) for question_id in question_ids]
+
+
+async def insert_responses(interview_id, rows, now, status="scored"):
+    """Store rows in one transaction (group-committed with other requests' writes on SQLite)."""
+    with metrics.stage("db_insert"):
+        await storage.backend().insert_responses(interview_id, rows, now, status)
+
+
+def similar_grade(qd, response_text):
+    """``(score, details)`` reused from a near-identical LLM-graded answer, or None."""
+    if not similarity.enabled(qd.get("qtype"), response_text):
+        return None
+    fp = similarity.fingerprint(qd.get("expected_answer"), llm.LLM_MODEL, LLM_PROMPT_VERSION)
+    with metrics.stage("similarity_lookup"):
+        found = similarity.lookup(qd.get("id"), fp, response_text)
+    if found is None:
+        return None
+    return found[1], {"skipped": "similar_answer", "similarity": round(found[0], 3)}
+
+
+def remember_grade(qd, response_text, llm_score_val, llm_details):
+    # Only fresh LLM verdicts seed the index (not cache hits or reused scores)
+    if llm_score_val is None or "cached" in llm_details or not similarity.enabled(qd.get("qtype"), response_text):
+        return
+    fp = similarity.fingerprint(qd.get("expected_answer"), llm.LLM_MODEL, LLM_PROMPT_VERSION)
+    similarity.add(qd.get("id"), fp, response_text, llm_score_val)
+
+
+async def grade(qd, response_text, priority="live"):
+    with metrics.stage("rule_eval"):
+        rule_score, rule_details = simple_rule_eval(qd, response_text)
+    if rule_details.get("confident"):
+        # The formula engine settled it; skip the LLM round trip entirely
+        return rule_score, {"rule": rule_details, "llm": {"skipped": "rule_confident"}}
+
+    reused = similar_grade(qd, response_text)
+    if reused is not None:
+        return blend(qd, rule_score, reused[0]), {"rule": rule_details, "llm": reused[1]}
+
+    # Includes verdict cache hits; raw provider latency is llm_request_duration_seconds
+    with metrics.stage("llm_score"):
+        llm_score_val, llm_details = await verdict_cache.get_or_compute(
+            qd.get("id"),
+            qd.get("expected_answer", ""),
+            response_text,
+            llm.LLM_MODEL,
+            LLM_PROMPT_VERSION,
+            lambda: llm_score(qd.get("text", ""), qd.get("expected_answer", ""), response_text, priority),
+        )
+    remember_grade(qd, response_text, llm_score_val, llm_details)
+
+    return blend(qd, rule_score, llm_score_val), {"rule": rule_details, "llm": llm_details}
+
+
+def blend(qd, rule_score, llm_score_val):
+    if llm_score_val is None:
+        metrics.FALLBACKS.inc("score_rule_only" if rule_score > 0 else "score_default")
+        return rule_score if rule_score > 0 else 3.0
+    if qd.get("qtype") == "formula":
+        return round((0.7 * rule_score + 0.3 * llm_score_val), 2)
+    return round(llm_score_val, 2)
+
+
+async def grade_many(items, pack=GRADE_PACK_SIZE, concurrency=GRADE_BATCH_CONCURRENCY, priority="live"):
+    """Grade ``(question_row, response_text)`` items, packing answers to the same question.
+
+    Results come back in input order. Rule-confident answers and near-duplicates
+    of already graded answers skip the LLM, single answers go through the cached per-answer path, and the rest are sent
+    ``pack`` at a time with at most ``concurrency`` LLM requests in flight.
+    """
+    results = [None] * len(items)
+    groups = {}
+    for i, (qd, text) in enumerate(items):
+        rule_score, rule_details = simple_rule_eval(qd, text)
+        reused = None if rule_details.get("confident") else similar_grade(qd, text)
+        if rule_details.get("confident"):
+            results[i] = (rule_score, {"rule": rule_details, "llm": {"skipped": "rule_confident"}})
+        elif reused is not None:
+            results[i] = (blend(qd, rule_score, reused[0]), {"rule": rule_details, "llm": reused[1]})
+        else:
+            groups.setdefault(qd.get("id"), []).append((i, rule_score, rule_details))
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def run(group):
+        async with sem:
+            if len(group) == 1:
+                i = group[0][0]
+                results[i] = await grade(*items[i], priority=priority)
+                return
+            qd = items[group[0][0]][0]
+            verdicts = await llm_score_batch(
+                qd.get("text", ""), qd.get("expected_answer", ""), [items[i][1] for i, _, _ in group], priority
+            )
+        for (i, rule_score, rule_details), (llm_score_val, llm_details) in zip(group, verdicts):
+            remember_grade(qd, items[i][1], llm_score_val, llm_details)
+            results[i] = (blend(qd, rule_score, llm_score_val), {"rule": rule_details, "llm": llm_details})
+
+    await asyncio.gather(*[
+        run(group[k:k + pack]) for group in groups.values() for k in range(0, len(group), pack)
+    ])
+    return results
+
 
+async def grade_response(row):
+    """Grade a stored (pending) response row; used by the scoring workers."""
+    qd = await run_in_threadpool(load_question, row["question_id"])
+    return await grade(qd, row["response_text"])
 
-# ✅ Submit response
+
+# ✅ Submit response (LLM awaited on the event loop, inserts group-committed by write_queue)
+# Pass next_idx to get that question back as "next_question", saving the
+# client a GET /questions round trip per answer; advance=true instead returns
+# the interview cursor's next question (stored first, so adaptive order sees
+# this answer's score).
 @app.post("/responses")
-def submit_response(
+async def submit_response(
     interview_id: str = Form(...),
     question_id: int = Form(...),
     response_text: str = Form(...),
+    next_idx: Optional[int] = Form(None),
+    advance: bool = Form(False),
 ):
-    conn = get_conn()
-    cur = conn.cursor()
+    response_id = str(uuid.uuid4())
+    now = int(time.time())
+    extra = {} if next_idx is None else {"next_question": await run_in_threadpool(get_question, next_idx)}
 
-    cur.execute("SELECT * FROM questions WHERE id=?", (question_id,))
-    q = cur.fetchone()
-    qd = dict(q) if q else {"id": question_id, "text": "N/A", "expected_answer": "", "qtype": "explain"}
+    if SCORING_MODE == "deferred":
+        await insert_responses(interview_id, [(response_id, question_id, response_text, None, None)], now, "pending")
+        scoring_worker.notify()
+        if advance:
+            extra["next_question"] = await advance_interview(interview_id)
+        return {"response_id": response_id, "status": "pending", "score": None, "evaluator": None, **extra}
 
-    rule_score, rule_details = simple_rule_eval(qd, response_text)
-    llm_score_val, llm_details = llm_score(
-        qd.get("text", ""), qd.get("expected_answer", ""), response_text
-    )
+    with metrics.stage("question_lookup"):
+        qd = await run_in_threadpool(load_question, question_id)
+    final_score, evaluator = await grade(qd, response_text)
 
-    if llm_score_val is None:
-        final_score = rule_score if rule_score > 0 else 3.0
-    else:
-        if qd.get("qtype") == "formula":
-            final_score = round((0.7 * rule_score + 0.3 * llm_score_val), 2)
+    await insert_responses(interview_id, [(response_id, question_id, response_text, final_score, evaluator)], now)
+    if advance:
+        extra["next_question"] = await advance_interview(interview_id)
+    return {"response_id": response_id, "status": "scored", "score": final_score, "evaluator": evaluator, **extra}
+
+
+# ✅ Submit and grade several answers in one round trip
+@app.post("/responses/batch")
+async def submit_responses_batch(payload: BatchResponses):
+    now = int(time.time())
+    ids = [str(uuid.uuid4()) for _ in payload.items]
+
+    if SCORING_MODE == "deferred":
+        rows = [(rid, it.question_id, it.response_text, None, None) for rid, it in zip(ids, payload.items)]
+        await insert_responses(payload.interview_id, rows, now, "pending")
+        scoring_worker.notify()
+        return {"responses": [{"response_id": rid, "status": "pending", "score": None} for rid in ids]}
+
+    with metrics.stage("question_lookup"):
+        questions = await run_in_threadpool(load_questions, [it.question_id for it in payload.items])
+    items = [(qd, it.response_text) for qd, it in zip(questions, payload.items)]
+    with metrics.stage("grade_batch"):
+        graded = await grade_many(items)
+    rows = [
+        (rid, it.question_id, it.response_text, score, evaluator)
+        for rid, it, (score, evaluator) in zip(ids, payload.items, graded)
+    ]
+    await insert_responses(payload.interview_id, rows, now)
+    return {
+        "responses": [
+            {"response_id": rid, "status": "scored", "score": score, "evaluator": evaluator}
+            for rid, _, _, score, evaluator in rows
+        ]
+    }
+
+
+# ✅ Spreadsheet upload: streamed to a temp file, checked in workbook.py's process
+# pool and stored as a scored response for the question, so it counts in the
+# final report like a typed answer. Required columns come from the
+# required_columns field (comma-separated) or, for task questions, the quoted
+# names in the question text; formula questions look for a cell matching the
+# expected formula.
+def workbook_columns(qd, field):
+    if field:
+        return [c.strip() for c in field.split(",") if c.strip()]
+    if qd.get("qtype") == "task":
+        return re.findall(r"'([^']+)'", qd.get("text") or "")
+    return []
+
+
+def workbook_grade(qd, result, required, require_formulas=False):
+    """``(score, rule_details)``: the mean of the checks that apply, each 0-5."""
+    checks, details = [], {"workbook": result}
+    if required:
+        checks.append(5.0 * len(result["columns_found"]) / len(required))
+    if qd.get("qtype") == "formula":
+        if result["matched_formula"]:
+            details["match"] = "equivalent"
+            checks.append(5.0)
         else:
-            final_score = round(llm_score_val, 2)
+            # Partial credit for the closest formula, as for a typed answer
+            best, best_details = max(
+                (simple_rule_eval(qd, f) for f in result["formulas"]), key=lambda r: r[0], default=(0.0, {})
+            )
+            details["func_hits"] = best_details.get("func_hits", 0)
+            checks.append(best)
+    elif require_formulas:
+        checks.append(5.0 if result["formula_cells"] else 0.0)
+    score = round(sum(checks) / len(checks), 2) if checks else 0.0
+    details["score"] = score
+    return score, details
+
 
-    evaluator = {"rule": rule_details, "llm": llm_details}
+def workbook_summary(filename, result):
+    text = (
+        f"[workbook {filename}] {len(result['sheets'])} sheet(s), {result['rows']} rows, "
+        f"{result['formula_cells']} formula cells"
+    )
+    if result["matched_formula"]:
+        text += f"; matching formula {result['matched_formula']}"
+    if result["columns_missing"]:
+        text += f"; missing columns {', '.join(result['columns_missing'])}"
+    return text
+
+
+def form_bool(fields, name):
+    value = fields.get(name, "").strip().lower()
+    if value in ("1", "true", "on", "yes"):
+        return True
+    if value in ("", "0", "false", "off", "no"):
+        return False
+    raise HTTPException(status_code=422, detail=f"{name} must be true or false")
+
+
+# Form fields: question_id, file, required_columns, require_formulas, advance.
+# The body is parsed here as it arrives (workbook.receive) instead of by FastAPI,
+# which would spool the whole upload to disk before the size limit could apply.
+@app.post("/interviews/{interview_id}/workbook")
+async def submit_workbook(interview_id: str, request: Request, content_length: Optional[int] = Header(None)):
+    # Multipart framing adds a little on top of the file itself
+    if content_length and content_length > workbook.WORKBOOK_MAX_BYTES + workbook.FIELDS_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"workbook larger than {workbook.WORKBOOK_MAX_BYTES} bytes")
     response_id = str(uuid.uuid4())
     now = int(time.time())
 
-    cur.execute(
-        "INSERT INTO responses (id,interview_id,question_id,response_text,score,evaluator_details,created_at) VALUES (?,?,?,?,?,?,?)",
-        (
-            response_id,
-            interview_id,
-            question_id,
-            response_text,
-            final_score,
-            json.dumps(evaluator),
-            now,
-        ),
-    )
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            fields, filename = await workbook.receive(request.stream(), request.headers.get("content-type"), tmp)
+        try:
+            question_id = int(fields["question_id"])
+        except (KeyError, ValueError):
+            raise HTTPException(status_code=422, detail="question_id must be an integer form field")
+        require_formulas, advance = form_bool(fields, "require_formulas"), form_bool(fields, "advance")
+        with metrics.stage("question_lookup"):
+            qd = await run_in_threadpool(load_question, question_id)
+        required = workbook_columns(qd, fields.get("required_columns"))
+        if not (required or require_formulas or qd.get("qtype") == "formula"):
+            # Nothing to score the workbook against; don't store a meaningless 0
+            raise HTTPException(
+                status_code=422,
+                detail="no workbook check applies to this question; send required_columns or require_formulas",
+            )
+        with metrics.stage("workbook_check"):
+            result = await workbook.check_async(
+                path, qd.get("expected_answer") or "", qd.get("qtype") == "formula", required
+            )
+    except workbook.WorkbookError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+    finally:
+        os.unlink(path)
+
+    final_score, rule_details = workbook_grade(qd, result, required, require_formulas)
+    evaluator = {"rule": rule_details, "llm": {"skipped": "workbook"}}
+    response_text = workbook_summary(filename, result)
+    await insert_responses(interview_id, [(response_id, question_id, response_text, final_score, evaluator)], now)
+    extra = {"next_question": await advance_interview(interview_id)} if advance else {}
+    return {"response_id": response_id, "status": "scored", "score": final_score, "evaluator": evaluator, **extra}
+
+
+# ✅ Poll a response's grading status
+@app.get("/responses/{response_id}")
+async def get_response(response_id: str):
+    r = await storage.backend().get_response(response_id)
+    if not r:
+        raise HTTPException(status_code=404, detail="Response not found")
+    return {
+        "response_id": r["id"],
+        "interview_id": r["interview_id"],
+        "question_id": r["question_id"],
+        "status": r["status"] or "scored",
+        "score": r["score"],
+        "evaluator": evaluator_store.from_row(r),
+    }
+
+
+# ✅ Cross-interview analytics (aggregates kept up to date on every insert; see analytics.py)
+def require_sqlite_analytics():
+    if storage.STORAGE_BACKEND != "sqlite":
+        raise HTTPException(status_code=501, detail="analytics needs STORAGE_BACKEND=sqlite")
+
 
-    conn.commit()
-    conn.close()
-    return {"response_id": response_id, "score": final_score, "evaluator": evaluator}
+@app.get("/analytics")
+async def analytics_overview():
+    require_sqlite_analytics()
+    return await run_in_threadpool(analytics.overview)
+
+
+@app.get("/analytics/questions")
+async def analytics_questions():
+    require_sqlite_analytics()
+    return {"questions": await run_in_threadpool(analytics.by_question)}
 
 
 # ✅ Final report
-@app.get("/final_report/{interview_id}")
-def final_report(interview_id: str):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT q.id as question_id,
-               q.text as question,
-               q.expected_answer as correct_answer,
-               r.response_text as your_answer,
-               r.score
-        FROM responses r
-        LEFT JOIN questions q ON r.question_id = q.id
-        WHERE r.interview_id = ?
-        ORDER BY r.created_at ASC
-        """,
-        (interview_id,),
-    )
-    rows = cur.fetchall()
-    conn.close()
+def budgeted_transcript(qa_list, budget_tokens):
+    """Most recent Q&A blocks that fit in ~budget_tokens (about 4 chars per token)."""
+    budget = budget_tokens * 4
+    blocks = []
+    for r in reversed(qa_list):
+        score = r["score"] if r["status"] != "pending" else "pending"
+        block = (
+            f"Q: {r['question']}\nYour Answer: {(r['your_answer'] or '')[:600]}\n"
+            f"Correct Answer: {r['correct_answer']}\nScore: {score}\n"
+        )
+        if len(block) > budget:
+            break
+        budget -= len(block)
+        blocks.append(block)
+    omitted = len(qa_list) - len(blocks)
+    if omitted:
+        blocks.append(f"({omitted} earlier answers omitted for length)\n")
+    return "\n".join(reversed(blocks))
+
+
+SUMMARY_FIELDS = ("summary_text", "strengths", "weaknesses")
+# A finished "key": "string" or "key": [list] pair inside a partially streamed JSON reply
+SUMMARY_FIELD_RE = re.compile(
+    r'"(summary_text|strengths|weaknesses)"\s*:\s*("(?:[^"\\]|\\.)*"|\[[^\]]*\])'
+)
 
-    if not rows:
-        raise HTTPException(status_code=404, detail="No responses found for this interview")
 
+async def prepare_report(interview_id, rows, transcript=False):
+    """Deterministic part of the report (fallback summary filled in) plus the LLM prompt."""
     qa_list = [dict(r) for r in rows]
-    avg_score = round(sum(r["score"] for r in qa_list) / len(qa_list), 2)
+    scored = [r for r in qa_list if r["status"] != "pending"]
+    pending = len(qa_list) - len(scored)
+    avg_score = round(sum(r["score"] for r in scored) / len(scored), 2) if scored else None
 
-    qa_text = "\n".join(
-        [
-            f"Q: {r['question']}\nYour Answer: {r['your_answer']}\nCorrect Answer: {r['correct_answer']}\nScore: {r['score']}\n"
-            for r in qa_list
-        ]
-    )
+    state = await storage.backend().summary_state(interview_id, len(scored))
 
-    prompt = f"""
+    if transcript:
+        prompt = f"""
 You are an interview evaluator. Analyze the following Q&A session and give:
 1. A short summary of performance
 2. Candidate strengths
 3. Candidate weaknesses
 
 Q&A session:
-{qa_text}
+{budgeted_transcript(qa_list, REPORT_TOKEN_BUDGET)}
 
 Return JSON only in this format:
 {{
@@ -248,27 +708,184 @@ Return JSON only in this format:
   "weaknesses": "list of weaknesses"
 }}
 """
+    else:
+        prompt = running_summary.summary_prompt(state)
 
-    summary = {"summary_text": "N/A", "strengths": "N/A", "weaknesses": "N/A"}
-    if GROQ_KEY:
-        try:
-            response = client.chat.completions.create(
-                model="llama-3.1-8b-instruct",
-                messages=[{"role": "user", "content": prompt}],
-                max_output_tokens=400,
-                temperature=0.2,
-            )
-            text = response.choices[0].message["content"].strip()
-            parsed = json.loads(re.search(r"\{.*\}", text, re.S).group(0))
-            summary = parsed
-        except Exception as e:
-            summary["error"] = str(e)
-
-    return {
+    summary = running_summary.fallback_summary(state)
+    report = {
         "interview_id": interview_id,
         "overall": avg_score,
-        "summary_text": summary.get("summary_text", "N/A"),
-        "strengths": summary.get("strengths", "N/A"),
-        "weaknesses": summary.get("weaknesses", "N/A"),
+        "pending": pending,
+        "summary_text": summary["summary_text"],
+        "strengths": summary["strengths"],
+        "weaknesses": summary["weaknesses"],
+        "breakdown": running_summary.breakdown(state),
         "questions": qa_list,
     }
+    return report, prompt
+
+
+async def build_report(interview_id, rows, transcript=False):
+    report, prompt = await prepare_report(interview_id, rows, transcript)
+
+    error = None
+    if llm.enabled():
+        try:
+            with metrics.stage("report_summary"):
+                text = await llm.chat(prompt, max_tokens=400, temperature=0.2, priority="report")
+            parsed = json.loads(re.search(r"\{.*\}", text, re.S).group(0))
+            for key in SUMMARY_FIELDS:
+                report[key] = parsed.get(key, "N/A")
+        except Exception as e:
+            error = str(e) or type(e).__name__
+    if error or not llm.enabled():
+        metrics.FALLBACKS.inc("report_summary")
+
+    # Only a complete, successfully summarised report is worth materializing
+    complete = not report["pending"] and error is None
+    return report, complete
+
+
+async def wait_for_grades(interview_id):
+    # Give deferred grades a moment to land before reporting them as pending
+    if SCORING_MODE != "deferred":
+        return
+    deadline = time.monotonic() + REPORT_PENDING_WAIT
+    while (
+        await run_in_threadpool(scoring_worker.pending_count, interview_id)
+        and time.monotonic() < deadline
+    ):
+        await asyncio.sleep(0.5)
+
+
+# ✅ Final report as PDF (rendered in a process pool, cached per report version)
+# Registered before /final_report/{interview_id}, which would otherwise match "<id>.pdf".
+@app.get("/final_report/{interview_id}.pdf")
+async def final_report_pdf(interview_id: str, if_none_match: Optional[str] = Header(None)):
+    await wait_for_grades(interview_id)
+
+    version = await storage.backend().report_version(interview_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="No responses found for this interview")
+
+    # Only a stored PDF gets an ETag, so a matching If-None-Match always refers to one
+    etag = reports.etag_for(version + "-pdf")
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    pdf = await storage.backend().load_pdf(interview_id, version)
+    complete = pdf is not None
+    if pdf is None:
+        report = await storage.backend().load_report(interview_id, version)
+        complete = report is not None
+        if report is None:
+            rows = await storage.backend().report_rows(interview_id)
+            report, complete = await build_report(interview_id, rows)
+            if complete:
+                await storage.backend().store_report(interview_id, version, report)
+        with metrics.stage("pdf_render"):
+            pdf = await pdf_report.render_async(report)
+        if complete:
+            await storage.backend().store_pdf(interview_id, version, pdf)
+
+    headers = {"Content-Disposition": f'attachment; filename="final_report_{interview_id}.pdf"'}
+    # A fallback PDF is rebuilt on the next request instead of being kept by the client
+    headers.update({"ETag": etag} if complete else {"Cache-Control": "no-store"})
+    # Response sets Content-Length from the body
+    return Response(pdf, media_type="application/pdf", headers=headers)
+
+
+@app.get("/final_report/{interview_id}")
+async def final_report(
+    interview_id: str,
+    transcript: bool = False,
+    if_none_match: Optional[str] = Header(None),
+):
+    await wait_for_grades(interview_id)
+
+    version = await storage.backend().report_version(interview_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="No responses found for this interview")
+
+    # Full-transcript reports are an on-demand variant and are never materialized.
+    # Only complete reports get an ETag, so a matching If-None-Match always
+    # refers to one.
+    etag = reports.etag_for(version + ("-t" if transcript else ""))
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    report = None if transcript else await storage.backend().load_report(interview_id, version)
+    complete = report is not None
+    if report is None:
+        with metrics.stage("report_rows"):
+            rows = await storage.backend().report_rows(interview_id)
+        report, complete = await build_report(interview_id, rows, transcript)
+        if complete and not transcript:
+            await storage.backend().store_report(interview_id, version, report)
+
+    # A pending or fallback-summary report must not be revalidated as current
+    headers = {"ETag": etag} if complete else {"Cache-Control": "no-store"}
+    return JSONResponse(report, headers=headers)
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# ✅ Final report over Server-Sent Events
+# Events: "questions" (per-question table + averages, sent first), "token"
+# (LLM summary text as it streams), "summary" (each summary field once its JSON
+# value is complete) and "done" (the full report).
+@app.get("/final_report/{interview_id}/stream")
+async def final_report_stream(interview_id: str):
+    version = await storage.backend().report_version(interview_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="No responses found for this interview")
+
+    async def events():
+        await wait_for_grades(interview_id)
+        current = await storage.backend().report_version(interview_id)
+        report = await storage.backend().load_report(interview_id, current)
+        if report is not None:
+            yield sse("questions", {k: v for k, v in report.items() if k not in SUMMARY_FIELDS})
+            for key in SUMMARY_FIELDS:
+                yield sse("summary", {key: report[key]})
+            yield sse("done", report)
+            return
+
+        rows = await storage.backend().report_rows(interview_id)
+        report, prompt = await prepare_report(interview_id, rows)
+        yield sse("questions", {k: v for k, v in report.items() if k not in SUMMARY_FIELDS})
+
+        error = None
+        if llm.enabled():
+            text, sent = "", set()
+            try:
+                async for delta in llm.stream_chat(prompt, max_tokens=400, temperature=0.2):
+                    text += delta
+                    yield sse("token", {"text": delta})
+                    for m in SUMMARY_FIELD_RE.finditer(text):
+                        if m.group(1) not in sent:
+                            sent.add(m.group(1))
+                            report[m.group(1)] = json.loads(m.group(2))
+                            yield sse("summary", {m.group(1): report[m.group(1)]})
+                parsed = json.loads(re.search(r"\{.*\}", text, re.S).group(0))
+                for key in SUMMARY_FIELDS:
+                    report[key] = parsed.get(key, "N/A")
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                yield sse("error", {"error": error})
+
+        if not llm.enabled() or error:
+            metrics.FALLBACKS.inc("report_summary")
+            for key in SUMMARY_FIELDS:
+                yield sse("summary", {key: report[key]})
+        yield sse("done", report)
+        if not report["pending"] and error is None:
+            await storage.backend().store_report(interview_id, current, report)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,119 @@
+# ✅ Local stand-in for the Groq chat-completions API (benchmarks and testing)
+#
+#   python bench/fake_groq.py --port 9000 --latency-ms 400 --jitter-ms 200 --error-rate 0.02
+#   GROQ_API_KEY=fake GROQ_BASE_URL=http://127.0.0.1:9000 uvicorn app:app --port 8000
+#
+# Simulate an outage (or recovery) while a load test runs:
+#   curl -X POST localhost:9000/config -H 'content-type: application/json' -d '{"error_rate": 1}'
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI()
+config = {"latency_ms": 300.0, "jitter_ms": 100.0, "error_rate": 0.0, "chunk_chars": 8}
+stats = {"requests": 0, "errors": 0, "streams": 0}
+
+
+def _reply_for(prompt):
+    """Plausible JSON for each prompt the backend sends."""
+    if "Candidate answers:" in prompt:
+        n = len(re.findall(r"^\[\d+\]", prompt, re.M))
+        return json.dumps([
+            {"id": i, "score": random.randint(0, 5), "rationale": "fake batch verdict"} for i in range(1, n + 1)
+        ])
+    if "summary_text" in prompt:
+        return json.dumps({
+            "summary_text": "Solid grasp of core Excel functions with some gaps.",
+            "strengths": ["lookup functions", "conditional aggregation"],
+            "weaknesses": ["array formulas"],
+        })
+    return json.dumps({"score": random.randint(0, 5), "rationale": "fake verdict"})
+
+
+async def _delay():
+    latency = config["latency_ms"] + random.uniform(-config["jitter_ms"], config["jitter_ms"])
+    await asyncio.sleep(max(0.0, latency) / 1000)
+
+
+@app.get("/stats")
+def get_stats():
+    return dict(stats, **config)
+
+
+@app.post("/config")
+async def set_config(request: Request):
+    changes = await request.json()
+    config.update({k: type(config[k])(v) for k, v in changes.items() if k in config})
+    return config
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    await _delay()
+
+    if random.random() < config["error_rate"]:
+        stats["errors"] += 1
+        status = random.choice([429, 500, 503])
+        return JSONResponse({"error": {"message": "fake provider error", "type": "fake"}}, status_code=status)
+
+    prompt = body["messages"][-1]["content"]
+    content = _reply_for(prompt)
+    prompt_tokens = len(prompt) // 4
+    completion_tokens = len(content) // 4
+    base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()), "model": body.get("model")}
+
+    if body.get("stream"):
+        stats["streams"] += 1
+
+        async def chunks():
+            step = config["chunk_chars"]
+            for i in range(0, len(content), step):
+                delta = {"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}
+                yield f"data: {json.dumps(dict(base, object='chat.completion.chunk', choices=[delta]))}\n\n"
+                await asyncio.sleep(0.01)
+            done = {"index": 0, "delta": {}, "finish_reason": "stop"}
+            yield f"data: {json.dumps(dict(base, object='chat.completion.chunk', choices=[done]))}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return dict(
+        base,
+        object="chat.completion",
+        choices=[{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        usage={
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Groq chat-completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=config["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=config["jitter_ms"])
+    parser.add_argument("--error-rate", type=float, default=config["error_rate"])
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    if args.seed is not None:
+        random.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
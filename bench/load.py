@@ -0,0 +1,200 @@
+# ✅ Load driver: full interview flows against a running backend
+#
+#   python bench/load.py --base-url http://127.0.0.1:8000 --users 50 --interviews 200 --questions 5
+#
+# Each flow is POST /interviews -> (GET /questions/{idx} -> POST /responses) x N
+# -> GET /final_report/{id}; with --combined each submit also returns the next
+# question (next_idx), as the Streamlit client does. Prints p50/p95/p99 per endpoint, throughput and
+# SQLite lock errors, and saves the run as JSON under bench/results/ so runs
+# can be compared (--compare an earlier file).
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# A mix of exact, equivalent, near-duplicate and free-text answers
+ANSWERS = [
+    '=SUMIFS(B:B, A:A, "India")',
+    '=SUMIF(A2:A100,"India",B2:B100)',
+    "=YEAR(A2)",
+    "=INDEX(C:C, MATCH(123, A:A, 0))",
+    "Absolute references use $ so they don't change when copied.",
+    "Use Remove Duplicates on the Data tab.",
+    "A pivot table summarizes data, e.g. sales by region.",
+    "I'm not sure.",
+]
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.lock_errors = 0
+
+    async def call(self, client, name, method, url, **kwargs):
+        started = time.perf_counter()
+        status, body = None, None
+        try:
+            r = await client.request(method, url, **kwargs)
+            status = r.status_code
+            body = r.json() if r.headers.get("content-type", "").startswith("application/json") else None
+            if status >= 500 and "locked" in r.text:
+                self.lock_errors += 1
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - started
+        self.samples.setdefault(name, []).append((elapsed, status))
+        return status, body
+
+
+async def interview_flow(client, rec, questions, combined=False):
+    payload = {
+        "candidate_name": "Load Test",
+        "candidate_email": "load@test.local",
+        "college_name": "Bench",
+        "course": "Excel",
+    }
+    status, body = await rec.call(client, "POST /interviews", "POST", "/interviews", json=payload)
+    if status != 200:
+        return False
+    interview_id = body["interview_id"]
+
+    q = None
+    for idx in range(questions):
+        if q is None:
+            status, q = await rec.call(client, "GET /questions/{idx}", "GET", f"/questions/{idx}")
+            if status != 200:
+                return False
+        form = {"interview_id": interview_id, "question_id": q["id"], "response_text": random.choice(ANSWERS)}
+        if combined:
+            form["next_idx"] = idx + 1
+        status, res = await rec.call(client, "POST /responses", "POST", "/responses", data=form)
+        if status != 200:
+            return False
+        q = res.get("next_question")
+
+    status, _ = await rec.call(client, "GET /final_report/{id}", "GET", f"/final_report/{interview_id}")
+    return status == 200
+
+
+def summarize(rec, wall, flows_ok, flows_total):
+    endpoints = {}
+    total = 0
+    for name, samples in sorted(rec.samples.items()):
+        lat = sorted(s[0] * 1000 for s in samples)
+        errors = sum(1 for s in samples if s[1] != 200)
+        total += len(samples)
+        endpoints[name] = {
+            "count": len(samples),
+            "errors": errors,
+            "p50_ms": round(percentile(lat, 50), 1),
+            "p95_ms": round(percentile(lat, 95), 1),
+            "p99_ms": round(percentile(lat, 99), 1),
+            "max_ms": round(lat[-1], 1),
+        }
+    return {
+        "wall_seconds": round(wall, 2),
+        "requests": total,
+        "throughput_rps": round(total / wall, 1) if wall else None,
+        "interviews_completed": flows_ok,
+        "interviews_failed": flows_total - flows_ok,
+        "interviews_per_second": round(flows_ok / wall, 2) if wall else None,
+        "sqlite_lock_errors": rec.lock_errors,
+        "endpoints": endpoints,
+    }
+
+
+def print_summary(result, baseline=None):
+    s = result["summary"]
+    print(f"\n{'endpoint':<26}{'count':>7}{'err':>6}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, e in s["endpoints"].items():
+        line = f"{name:<26}{e['count']:>7}{e['errors']:>6}{e['p50_ms']:>9}{e['p95_ms']:>9}{e['p99_ms']:>9}"
+        old = (baseline or {}).get("summary", {}).get("endpoints", {}).get(name)
+        if old:
+            line += f"   p95 {e['p95_ms'] - old['p95_ms']:+.1f} ms vs baseline"
+        print(line)
+    print(
+        f"\n{s['requests']} requests in {s['wall_seconds']} s -> {s['throughput_rps']} req/s, "
+        f"{s['interviews_completed']} interviews ({s['interviews_failed']} failed), "
+        f"{s['sqlite_lock_errors']} SQLite lock errors"
+    )
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+async def run(args):
+    rec = Recorder()
+    sem = asyncio.Semaphore(args.users)
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        async def one():
+            async with sem:
+                return await interview_flow(client, rec, args.questions, args.combined)
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*[one() for _ in range(args.interviews)])
+        wall = time.perf_counter() - started
+
+    return rec, wall, sum(outcomes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interview-flow load test")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=20, help="concurrent interview flows")
+    parser.add_argument("--interviews", type=int, default=100, help="total interview flows")
+    parser.add_argument("--questions", type=int, default=5, help="answers per interview")
+    parser.add_argument("--combined", action="store_true", help="fetch the next question with each submit")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--label", default="", help="free-form tag stored with the result")
+    parser.add_argument("--out", default=RESULTS_DIR)
+    parser.add_argument("--compare", help="earlier result JSON to diff p95 against")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    rec, wall, ok = asyncio.run(run(args))
+
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "label": args.label,
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "summary": summarize(rec, wall, ok, args.interviews),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_summary(result, baseline)
+
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print("💾 saved", path)
+
+
+if __name__ == "__main__":
+    main()
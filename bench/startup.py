@@ -0,0 +1,122 @@
+# ✅ Cold-start benchmark
+#
+#   python bench/startup.py --runs 5
+#
+# Measures (1) the import time of app.py and its heaviest direct imports, from
+# `python -X importtime`, and (2) wall time from spawning uvicorn to the first
+# 200 from /health and from /ready, on a fresh DB file (first boot: DDL + seed)
+# and on an existing one (restart: PRAGMA user_version fast path).
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile():
+    """Cumulative microseconds for ``app`` and each of its direct imports."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stderr
+    total, children = None, {}
+    for line in out.splitlines():
+        m = IMPORT_LINE.match(line)
+        if not m:
+            continue
+        cumulative, depth, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        # Children are printed before their parent, one indent level deeper
+        if depth == 1:
+            if name == "app":
+                return cumulative, children
+            children = {}
+        elif depth == 3:
+            children[name] = cumulative
+    return total, children
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as r:
+                if r.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.005)
+    return None
+
+
+def boot_once(db_path, timeout):
+    port = free_port()
+    env = dict(os.environ, INTERVIEW_DB=db_path)
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        health = wait_for(f"http://127.0.0.1:{port}/health", started + timeout)
+        ready = wait_for(f"http://127.0.0.1:{port}/ready", started + timeout)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return (
+        None if health is None else health - started,
+        None if ready is None else ready - started,
+    )
+
+
+def fmt(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return "timeout"
+    return f"median {statistics.median(values) * 1000:7.1f} ms  (min {min(values) * 1000:.1f}, max {max(values) * 1000:.1f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.runs):
+        total, children = import_profile()
+        totals.append(total / 1e6)
+    print(f"import app          {fmt(totals)}")
+    for name, us in sorted(children.items(), key=lambda kv: -kv[1])[:8]:
+        print(f"  {name:<18}{us / 1000:8.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fresh, warm = {"health": [], "ready": []}, {"health": [], "ready": []}
+        for i in range(args.runs):
+            db_path = os.path.join(tmp, f"bench_{i}.db")
+            for bucket in (fresh, warm):
+                health, ready = boot_once(db_path, args.timeout)
+                bucket["health"].append(health)
+                bucket["ready"].append(ready)
+
+    print(f"first boot /health  {fmt(fresh['health'])}")
+    print(f"first boot /ready   {fmt(fresh['ready'])}")
+    print(f"restart    /health  {fmt(warm['health'])}")
+    print(f"restart    /ready   {fmt(warm['ready'])}")
+
+
+if __name__ == "__main__":
+    main()
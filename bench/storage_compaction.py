@@ -0,0 +1,133 @@
+# ✅ Evaluator storage footprint and report-query latency
+#
+#   python bench/storage_compaction.py --interviews 2000 --per-interview 10
+#
+# Fills a scratch DB with responses in the old format (full evaluator dict as
+# plain JSON in responses.evaluator_details, raw LLM reply included), then
+# measures the responses table (row payload and pages, from dbstat) and the
+# report query (storage.load_report_rows) three times: as written, after the
+# db_init conversion to typed columns + zlib blobs (followed by the one-time
+# VACUUM of compact.py --enable-incremental), and after compact.py has archived
+# the blobs and incremental_vacuum has released the free pages.
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RAW = (
+    '{"score": %d, "rationale": "The answer explains that %s but does not mention how the '
+    'reference behaves when the formula is filled across rows and columns, which the question '
+    'asks for. A stronger answer would give an example such as =$A$1*B2 and say which part moves."}'
+)
+
+
+def legacy_evaluator(rng, qtype):
+    llm_score = rng.randint(1, 5)
+    rule = (
+        {"match": rng.random() < 0.5, "func_hits": rng.randint(0, 3), "expected": "=SUM(A1:A10)", "got": "=SUM(A1:A9)"}
+        if qtype == "formula"
+        else {"note": "no rule-based score"}
+    )
+    reason = rng.choice(["relative references shift", "absolute references stay fixed", "mixed references pin one axis"])
+    return {"rule": rule, "llm": {"raw": RAW % (llm_score, reason), "model": "llama-3.1-8b-instant"}}
+
+
+def populate(db, interviews, per_interview, seed):
+    rng = random.Random(seed)
+    created = int(time.time()) - 90 * 86400
+    with db.connection() as conn:
+        cur = conn.cursor()
+        qs = [(r["id"], r["qtype"]) for r in cur.execute("SELECT id, qtype FROM questions")]
+        ids = []
+        for i in range(interviews):
+            interview_id = str(uuid.uuid4())
+            ids.append(interview_id)
+            cur.execute(
+                "INSERT INTO interviews (id,candidate_id,status,created_at,current_question_idx) VALUES (?,?,?,?,?)",
+                (interview_id, None, "in_progress", created + i, 0),
+            )
+            rows = []
+            for question_id, qtype in rng.sample(qs, min(per_interview, len(qs))):
+                evaluator = legacy_evaluator(rng, qtype)
+                rows.append((
+                    str(uuid.uuid4()), interview_id, question_id,
+                    "Relative references change when the formula is copied; absolute ones do not. " * 2,
+                    round(rng.uniform(1, 5), 2), json.dumps(evaluator), created + i, "scored",
+                ))
+            cur.executemany(
+                "INSERT INTO responses (id,interview_id,question_id,response_text,score,evaluator_details,created_at,status) VALUES (?,?,?,?,?,?,?,?)",
+                rows,
+            )
+        conn.commit()
+    return ids
+
+
+def measure(db, storage, ids, queries, seed):
+    with db.connection() as conn:
+        payload, pages = conn.execute("SELECT SUM(payload), SUM(pgsize) FROM dbstat WHERE name='responses'").fetchone()
+        rows = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        file_bytes = conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+        archive = conn.execute("SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name='response_archive'").fetchone()[0]
+    rng = random.Random(seed)
+    times = []
+    for interview_id in (rng.choice(ids) for _ in range(queries)):
+        started = time.perf_counter()
+        storage.load_report_rows(interview_id)
+        times.append(time.perf_counter() - started)
+    return payload / rows, pages / rows, archive, file_bytes, statistics.median(times), sorted(times)[int(len(times) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluator storage compaction benchmark")
+    parser.add_argument("--interviews", type=int, default=2000)
+    parser.add_argument("--per-interview", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=2000, help="report queries per measurement")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["INTERVIEW_DB"] = os.path.join(tmp, "bench.db")
+        # Keep the page cache cold-ish so the query cost tracks the table size
+        os.environ.setdefault("DB_MMAP_SIZE", "0")
+        sys.path.insert(0, ROOT)
+        import compact
+        import db
+        import db_init
+        import evaluator_store
+        import storage
+
+        db_init.init_db()
+        ids = populate(db, args.interviews, args.per_interview, args.seed)
+
+        print(f"{'stage':<28}{'row B':>7}{'page B/row':>12}{'archive MB':>12}{'file MB':>10}{'p50 ms':>9}{'p99 ms':>9}")
+
+        def show(label):
+            payload, pages, archive, file_bytes, p50, p99 = measure(db, storage, ids, args.queries, args.seed)
+            print(
+                f"{label:<28}{payload:>7.0f}{pages:>12.0f}{archive / 1e6:>12.2f}{file_bytes / 1e6:>10.2f}"
+                f"{p50 * 1000:>9.3f}{p99 * 1000:>9.3f}"
+            )
+
+        show("plain JSON (legacy)")
+        started = time.perf_counter()
+        with db.connection() as conn:
+            converted = evaluator_store.convert_legacy(conn)
+        convert_s = time.perf_counter() - started
+        compact.enable_incremental()
+        show("typed columns + zlib")
+        interviews, moved, _ = compact.run(days=30)
+        show("compacted + vacuumed")
+        print(f"\nconverted {converted} rows in {convert_s:.2f} s; archived {moved} evaluators of {interviews} interviews")
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# ✅ Group commit vs per-request commit
+#
+#   python bench/write_queue.py --writers 64 --writes 4000
+#
+# Inserts scored responses (storage.write_responses, the job /responses uses,
+# running summary included) into a scratch DB from N concurrent coroutines,
+# once per path: a commit per request on the threadpool (WRITE_QUEUE=0), and
+# the group-commit queue at each durability level. Prints throughput and
+# per-write latency percentiles, and how many writes failed with "database is
+# locked" (the per-request path under contention).
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def run(storage, write_queue, writers, writes, mode, durability):
+    write_queue.WRITE_QUEUE = mode == "queue"
+    write_queue.WRITE_DURABILITY = durability
+    interview_id = str(uuid.uuid4())
+    evaluator = {"rule": {"note": "no rule-based score"}, "llm": {"raw": '{"score": 4, "rationale": "bench"}'}}
+    latencies, errors = [], []
+    sem = asyncio.Semaphore(writers)
+
+    async def one():
+        async with sem:
+            row = (str(uuid.uuid4()), 1, "Relative references change when copied.", 4.0, evaluator)
+            started = time.perf_counter()
+            try:
+                await write_queue.write(storage.write_responses, interview_id, [row], int(time.time()))
+            except sqlite3.OperationalError as e:
+                errors.append(e)
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(writes)])
+    # "async" durability returns before the commit; wait for the queue to drain
+    await asyncio.get_running_loop().run_in_executor(None, write_queue.stop)
+    wall = time.perf_counter() - started
+    return wall, latencies, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Group-commit write queue benchmark")
+    parser.add_argument("--writers", type=int, default=64, help="concurrent writers")
+    parser.add_argument("--writes", type=int, default=4000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["INTERVIEW_DB"] = os.path.join(tmp, "bench.db")
+        sys.path.insert(0, ROOT)
+        import db
+        import db_init
+        import storage
+        import write_queue
+
+        db_init.init_db()
+        print(f"{'path':<30}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'batches':>9}{'locked':>8}")
+        for mode, durability in (("direct", "normal"), ("direct", "full"), ("queue", "normal"), ("queue", "full"), ("queue", "async")):
+            batches_before = write_queue.stats["batches"]
+            wall, lat, errors = asyncio.run(run(storage, write_queue, args.writers, args.writes, mode, durability))
+            batches = write_queue.stats["batches"] - batches_before
+            label = f"{'per-request commit' if mode == 'direct' else 'group commit'} ({durability})"
+            print(
+                f"{label:<30}{(args.writes - errors) / wall:>10.0f}{statistics.median(lat) * 1000:>9.2f}"
+                f"{pct(lat, 99) * 1000:>9.2f}{batches if mode == 'queue' else args.writes:>9}{errors:>8}"
+            )
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from types import MappingProxyType
+
+import db
+import formula
+
+# ✅ In-memory question catalog
+# Loaded once, ordered by (difficulty, id) like the old ORDER BY ... OFFSET
+# query, and swapped wholesale when the questions table changes (triggers in
+# db_init bump meta.questions_version).
+CATALOG_CHECK_INTERVAL = float(os.environ.get("CATALOG_CHECK_INTERVAL", "2"))
+
+COLUMNS = ("id", "text", "qtype", "difficulty", "expected_answer", "rubric")
+
+
+class Question:
+    __slots__ = COLUMNS + ("formula",)
+
+    def __init__(self, row):
+        for name in COLUMNS:
+            object.__setattr__(self, name, row[name])
+        # Model-answer AST, compiled once per catalog load
+        compiled = formula.compile_expected(row["expected_answer"]) if row["qtype"] == "formula" else None
+        object.__setattr__(self, "formula", compiled)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Question is immutable")
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in COLUMNS}
+
+
+class QuestionCatalog:
+    __slots__ = ("version", "ordered", "by_id", "levels", "bands")
+
+    def __init__(self, version, questions):
+        self.version = version
+        self.ordered = tuple(sorted(questions, key=lambda q: (q.difficulty is None, q.difficulty, q.id)))
+        self.by_id = MappingProxyType({q.id: q for q in self.ordered})
+        # Question ids per difficulty (easiest first), for O(1) picks by position
+        bands = {}
+        for q in self.ordered:
+            bands.setdefault(q.difficulty, []).append(q.id)
+        self.levels = tuple(bands)
+        self.bands = MappingProxyType({level: tuple(ids) for level, ids in bands.items()})
+
+    def __len__(self):
+        return len(self.ordered)
+
+    def at(self, idx):
+        """Question at position ``idx`` in interview order, or None."""
+        if 0 <= idx < len(self.ordered):
+            return self.ordered[idx]
+        return None
+
+    def get(self, question_id):
+        return self.by_id.get(question_id)
+
+
+_catalog = None
+_checked_at = 0.0
+_installed = False  # set by install(): rows came from another store, skip the meta checks
+_lock = threading.Lock()
+
+
+def _read_version(cur):
+    cur.execute("SELECT value FROM meta WHERE key='questions_version'")
+    row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def load():
+    global _catalog, _checked_at
+    with db.connection() as conn:
+        cur = conn.cursor()
+        version = _read_version(cur)
+        cur.execute("SELECT * FROM questions")
+        rows = cur.fetchall()
+    _catalog = QuestionCatalog(version, [Question(r) for r in rows])
+    _checked_at = time.monotonic()
+    return _catalog
+
+
+def install(rows, version=0):
+    """Serve questions loaded elsewhere (storage.py's server backend) instead of the SQLite file."""
+    global _catalog, _installed
+    _catalog = QuestionCatalog(version, [Question(r) for r in rows])
+    _installed = True
+    return _catalog
+
+
+def current():
+    """Return the catalog, reloading it if the questions table changed."""
+    global _checked_at
+    cat = _catalog
+    if cat is not None and _installed:
+        return cat
+    if cat is not None and time.monotonic() - _checked_at < CATALOG_CHECK_INTERVAL:
+        return cat
+
+    with _lock:
+        if _catalog is not None and time.monotonic() - _checked_at < CATALOG_CHECK_INTERVAL:
+            return _catalog
+        if _catalog is not None:
+            with db.connection() as conn:
+                version = _read_version(conn.cursor())
+            if version == _catalog.version:
+                _checked_at = time.monotonic()
+                return _catalog
+        return load()
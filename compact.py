@@ -0,0 +1,120 @@
+import argparse
+import os
+import time
+
+import db
+import db_init
+
+# ✅ Compaction of old interviews
+# Reports and analytics only read the typed response columns, so once an
+# interview is older than COMPACT_AFTER_DAYS (and has nothing left to grade) its
+# compressed evaluator blobs move to response_archive, out of the pages every
+# report query walks. GET /responses/{id} still returns them from there.
+# Shrinking a row in place leaves the bytes stranded in a half-empty page, so
+# the interview's responses are deleted and re-inserted without the blob: the
+# old pages empty out and the rows land densely packed at the end of the table
+# (with new rowids, so don't run this next to a regrade job).
+# Each chunk of COMPACT_CHUNK interviews is one transaction; freed pages are
+# handed back to the filesystem with incremental_vacuum (VACUUM_PAGES at a
+# time, 0 = all) when the database uses auto_vacuum=INCREMENTAL.
+#   python compact.py [--days N] [--dry-run]
+#   python compact.py --enable-incremental   (one-time full VACUUM of an old DB)
+COMPACT_AFTER_DAYS = float(os.environ.get("COMPACT_AFTER_DAYS", "30"))
+COMPACT_CHUNK = int(os.environ.get("COMPACT_CHUNK", "200"))
+VACUUM_PAGES = int(os.environ.get("VACUUM_PAGES", "0"))
+
+
+def candidates(cutoff):
+    """Ids of interviews created before ``cutoff`` that still hold evaluator blobs and have no pending grades."""
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT i.id FROM interviews i
+            WHERE i.created_at < ?
+              AND EXISTS (SELECT 1 FROM responses r WHERE r.interview_id = i.id AND r.evaluator_z IS NOT NULL)
+              AND NOT EXISTS (SELECT 1 FROM responses r WHERE r.interview_id = i.id AND r.status = 'pending')
+            ORDER BY i.created_at
+            """,
+            (cutoff,),
+        )
+        return [r["id"] for r in cur.fetchall()]
+
+
+def archive_chunk(interview_ids, now):
+    """Move the evaluator blobs of ``interview_ids`` to response_archive; returns responses moved."""
+    marks = ",".join("?" * len(interview_ids))
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(
+            f"""
+            INSERT OR REPLACE INTO response_archive (response_id, evaluator, archived_at)
+            SELECT id, evaluator_z, ? FROM responses
+            WHERE interview_id IN ({marks}) AND evaluator_z IS NOT NULL
+            """,
+            [now] + interview_ids,
+        )
+        moved = cur.rowcount
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS compact_rows AS SELECT * FROM responses WHERE 0")
+        cur.execute(f"INSERT INTO temp.compact_rows SELECT * FROM responses WHERE interview_id IN ({marks})", interview_ids)
+        cur.execute(f"DELETE FROM responses WHERE interview_id IN ({marks})", interview_ids)
+        cur.execute("UPDATE temp.compact_rows SET evaluator_z=NULL")
+        cur.execute("INSERT INTO responses SELECT * FROM temp.compact_rows")
+        cur.execute("DELETE FROM temp.compact_rows")
+        cur.execute(f"UPDATE interviews SET status='archived' WHERE id IN ({marks})", interview_ids)
+        conn.commit()
+    return moved
+
+
+def vacuum(pages=VACUUM_PAGES):
+    """Release free pages to the filesystem; returns pages freed (0 unless auto_vacuum=INCREMENTAL)."""
+    with db.connection() as conn:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def enable_incremental():
+    """Switch an existing database to auto_vacuum=INCREMENTAL (rewrites the whole file)."""
+    with db.connection() as conn:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def run(days=COMPACT_AFTER_DAYS, chunk=COMPACT_CHUNK, dry_run=False):
+    now = int(time.time())
+    ids = candidates(now - int(days * 86400))
+    if dry_run:
+        return len(ids), 0, 0
+    moved = 0
+    for i in range(0, len(ids), chunk):
+        moved += archive_chunk(ids[i:i + chunk], now)
+    return len(ids), moved, vacuum()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive evaluator details of old interviews")
+    parser.add_argument("--days", type=float, default=COMPACT_AFTER_DAYS, help="compact interviews older than this")
+    parser.add_argument("--chunk", type=int, default=COMPACT_CHUNK, help="interviews per transaction")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--enable-incremental", action="store_true", help="one-time VACUUM to auto_vacuum=INCREMENTAL")
+    args = parser.parse_args(argv)
+
+    db_init.init_db()
+    if args.enable_incremental:
+        ok = enable_incremental()
+        print("✅ auto_vacuum=INCREMENTAL" if ok else "❌ auto_vacuum unchanged")
+        return
+    interviews, moved, freed = run(args.days, args.chunk, args.dry_run)
+    if args.dry_run:
+        print(f"… would compact {interviews} interviews")
+    else:
+        print(f"✅ compacted {interviews} interviews: {moved} evaluators archived, {freed} pages freed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# ✅ Shared SQLite connection pool
+# Connections are opened once, tuned with the pragmas below and reused by every
+# request handler, worker and db_init instead of a connect/close per request.
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+DB = os.environ.get("INTERVIEW_DB") or os.path.join(backend_dir, "interviews.db")
+
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "16"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", str(64 * 1024 * 1024)))
+DB_STATEMENT_CACHE = int(os.environ.get("DB_STATEMENT_CACHE", "256"))
+
+_idle = queue.LifoQueue()
+_lock = threading.Lock()
+_opened = 0
+stats = {"opened": 0, "checkouts": 0, "in_use": 0, "waits": 0, "wait_seconds": 0.0, "rollbacks": 0}
+
+
+def _open():
+    conn = sqlite3.connect(
+        DB,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        cached_statements=DB_STATEMENT_CACHE,
+    )
+    conn.row_factory = sqlite3.Row
+    if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+        # New file: lets compact.py hand freed pages back (--enable-incremental converts old ones)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def _acquire():
+    global _opened
+    try:
+        return _idle.get_nowait()
+    except queue.Empty:
+        pass
+
+    with _lock:
+        if _opened < DB_POOL_SIZE:
+            _opened += 1
+            stats["opened"] += 1
+            create = True
+        else:
+            create = False
+    if create:
+        try:
+            return _open()
+        except Exception:
+            with _lock:
+                _opened -= 1
+            raise
+
+    stats["waits"] += 1
+    started = time.perf_counter()
+    try:
+        return _idle.get(timeout=DB_POOL_TIMEOUT)
+    except queue.Empty:
+        raise sqlite3.OperationalError("connection pool exhausted")
+    finally:
+        stats["wait_seconds"] += time.perf_counter() - started
+
+
+def _release(conn):
+    if conn.in_transaction:
+        conn.rollback()
+        stats["rollbacks"] += 1
+    _idle.put(conn)
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection; uncommitted work is rolled back on return."""
+    conn = _acquire()
+    with _lock:
+        stats["checkouts"] += 1
+        stats["in_use"] += 1
+    try:
+        yield conn
+    finally:
+        with _lock:
+            stats["in_use"] -= 1
+        _release(conn)
+
+
+def close_all():
+    global _opened
+    while True:
+        try:
+            conn = _idle.get_nowait()
+        except queue.Empty:
+            break
+        conn.close()
+        with _lock:
+            _opened -= 1
+
+
+def snapshot():
+    return dict(stats, size=DB_POOL_SIZE, open=_opened, idle=_idle.qsize())
@@ -0,0 +1,115 @@
+import json
+import os
+import re
+import zlib
+
+# ✅ Compact evaluator storage
+# A response keeps what reports and analytics read in typed columns
+# (rule_score, llm_score, llm_rationale, func_hits, and source: "workbook" for
+# uploaded spreadsheets, NULL for typed answers). The full evaluator dict,
+# including the raw LLM reply, is stored zlib-compressed in responses.evaluator_z
+# and moved to response_archive once the interview is compacted (compact.py).
+# responses.evaluator_details (plain JSON) is only found in rows written before
+# this format; db_init converts them on upgrade.
+EVALUATOR_ZLIB_LEVEL = int(os.environ.get("EVALUATOR_ZLIB_LEVEL", "6"))
+
+COLUMNS = ("rule_score", "llm_score", "llm_rationale", "func_hits", "source")
+RATIONALE_CHARS = 160
+
+# Preset dictionary of the strings every evaluator repeats, so even a short
+# record compresses. Blobs are tagged with the dictionary they used: never edit
+# _ZDICT_V1, add a _ZDICT_V2 and a new tag instead.
+_ZDICT_V1 = (
+    b'{"rule":{"note":"no rule-based score"},{"rule":{"match":false,"func_hits":0,"expected":"=","got":"=",'
+    b'"score":,"confident":true},"llm":{"skipped":"rule_confident"},"similarity":"similar_answer","cached":'
+    b'"error":"no_groq_key","batch":"raw":"{\\"score\\": , \\"rationale\\": \\"The answer '
+)
+_TAG_V1 = b"\x01"
+
+_LLM_SCORE_RE = re.compile(r'"?score"?\s*[:=]\s*([0-9]+(\.[0-9]+)?)')
+_RATIONALE_RE = re.compile(r'"rationale"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+def _rationale(raw):
+    m = _RATIONALE_RE.search(raw)
+    if not m:
+        return None
+    try:
+        return json.loads(m.group(1))[:RATIONALE_CHARS]
+    except ValueError:
+        return m.group(1)[1:-1][:RATIONALE_CHARS]
+
+
+def columns(evaluator):
+    """Typed column values for an evaluator dict, in COLUMNS order."""
+    rule = (evaluator or {}).get("rule") or {}
+    llm = (evaluator or {}).get("llm") or {}
+    rule_score = rule.get("score")
+    if rule_score is None and rule.get("match"):
+        # Graded before the rule score was recorded: exact/equivalent matches are 5
+        rule_score = 5.0
+    raw = llm.get("raw") or ""
+    m = _LLM_SCORE_RE.search(raw)
+    return (
+        rule_score,
+        float(m.group(1)) if m else None,
+        _rationale(raw),
+        rule.get("func_hits"),
+        "workbook" if llm.get("skipped") == "workbook" else None,
+    )
+
+
+def pack(evaluator):
+    if evaluator is None:
+        return None
+    z = zlib.compressobj(EVALUATOR_ZLIB_LEVEL, zdict=_ZDICT_V1)
+    return _TAG_V1 + z.compress(json.dumps(evaluator, separators=(",", ":")).encode("utf-8")) + z.flush()
+
+
+def unpack(blob):
+    if blob is None:
+        return None
+    if blob[:1] != _TAG_V1:
+        raise ValueError(f"unknown evaluator blob format {blob[:1]!r}")
+    z = zlib.decompressobj(zdict=_ZDICT_V1)
+    return json.loads(z.decompress(blob[1:]) + z.flush())
+
+
+def convert_legacy(conn, chunk=500):
+    """Move plain-JSON evaluator_details into typed columns + evaluator_z; returns rows converted."""
+    cur = conn.cursor()
+    total = 0
+    while True:
+        cur.execute(
+            "SELECT id, evaluator_details FROM responses WHERE evaluator_details IS NOT NULL LIMIT ?",
+            (chunk,),
+        )
+        rows = cur.fetchall()
+        if not rows:
+            return total
+        updates = []
+        for r in rows:
+            evaluator = json.loads(r["evaluator_details"]) if r["evaluator_details"] else None
+            updates.append((*columns(evaluator), pack(evaluator), r["id"]))
+        cur.executemany(
+            """
+            UPDATE responses SET rule_score=?, llm_score=?, llm_rationale=?, func_hits=?, source=?,
+                   evaluator_z=?, evaluator_details=NULL
+            WHERE id=?
+            """,
+            updates,
+        )
+        conn.commit()
+        total += len(rows)
+
+
+def from_row(row):
+    """The evaluator dict of a responses row (current, archived or legacy JSON column)."""
+    keys = row.keys()
+    if "evaluator_z" in keys and row["evaluator_z"] is not None:
+        return unpack(row["evaluator_z"])
+    if "archived" in keys and row["archived"] is not None:
+        return unpack(row["archived"])
+    if "evaluator_details" in keys and row["evaluator_details"]:
+        return json.loads(row["evaluator_details"])
+    return None
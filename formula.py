@@ -0,0 +1,511 @@
+import itertools
+import re
+
+# ✅ Excel formula tokenizer, parser and equivalence check
+# Formulas are parsed into small tuple ASTs and canonicalized so that
+# spellings Excel treats the same compare equal: case, $ anchoring, whole
+# column vs bounded ranges (B:B ~ B2:B100), operand order of + / * / = and of
+# SUM-like arguments, and SUMIF / SUMIFS / SUMPRODUCT((A=x)*B) forms. Bare
+# names in a model answer (e.g. "values", "weights", "n") act as placeholders
+# that bind consistently to whatever the candidate wrote in their place; when
+# that is the wrong kind for the slot (a range or string where a number goes,
+# a cell inside a range the formula reads) the answer can't be judged here.
+
+
+class FormulaError(ValueError):
+    pass
+
+
+TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+  | (?P<str>"(?:[^"]|"")*")
+  | (?P<func>(?:_xlfn\.)?[A-Za-z_][A-Za-z0-9_.]*(?=\s*\())
+  | (?P<range>(?:(?:'[^']+'|[A-Za-z_][A-Za-z0-9_.]*)!)?
+        (?:\$?[A-Za-z]{1,3}\$?[0-9]+:\$?[A-Za-z]{1,3}\$?[0-9]+
+          |\$?[A-Za-z]{1,3}:\$?[A-Za-z]{1,3}
+          |\$?[0-9]+:\$?[0-9]+)(?![A-Za-z0-9_(]))
+  | (?P<ref>(?:(?:'[^']+'|[A-Za-z_][A-Za-z0-9_.]*)!)?\$?[A-Za-z]{1,3}\$?[0-9]+(?![A-Za-z0-9_(]))
+  | (?P<num>[0-9]+(?:\.[0-9]*)?(?:[eE][+-]?[0-9]+)?|\.[0-9]+(?:[eE][+-]?[0-9]+)?)
+  | (?P<name>[A-Za-z_\\][A-Za-z0-9_.]*)
+  | (?P<op><=|>=|<>|[-+*/^&=<>%])
+  | (?P<punct>[(),;])
+    """,
+    re.X,
+)
+
+CELL_RE = re.compile(r"\$?([A-Za-z]{1,3})?\$?([0-9]+)?$")
+
+# Functions whose arguments can be reordered without changing the result
+COMMUTATIVE_ARGS = {"SUM", "PRODUCT", "MAX", "MIN", "AND", "OR", "COUNT", "COUNTA", "AVERAGE", "SUMPRODUCT"}
+COMPARISONS = {"=", "<>", "<", ">", "<=", ">="}
+FLIPPED = {"<": ">", ">": "<", "<=": ">=", ">=": "<=", "=": "=", "<>": "<>"}
+MAX_PERMUTED = 6
+MAX_MATCHES = 1000
+
+# Argument positions that take a range or array (None: all of them); a
+# placeholder anywhere else stands for a single number
+ARRAY_ARGS = {
+    "SUM": None, "SUMPRODUCT": None, "PRODUCT": None, "AVERAGE": None, "COUNT": None,
+    "COUNTA": None, "MAX": None, "MIN": None, "AND": None, "OR": None,
+    "LARGE": (0,), "SMALL": (0,), "UNIQUE": (0,), "SORT": (0,), "INDEX": (0,),
+    "MATCH": (1,), "VLOOKUP": (1,), "HLOOKUP": (1,), "XLOOKUP": (1, 2), "FILTER": (0, 1),
+    "SUMIFS": (0,), "AVERAGEIFS": (0,), "COUNTIFS": (0,),
+}
+
+
+def tokenize(text):
+    tokens, pos = [], 0
+    while pos < len(text):
+        m = TOKEN_RE.match(text, pos)
+        if not m:
+            raise FormulaError(f"unexpected character {text[pos]!r} at {pos}")
+        pos = m.end()
+        if m.lastgroup != "ws":
+            tokens.append((m.lastgroup, m.group()))
+    return tokens
+
+
+def _split_sheet(text):
+    if "!" in text:
+        sheet, _, rest = text.rpartition("!")
+        return sheet.strip("'").upper(), rest
+    return "", text
+
+
+def _cell(text):
+    col, row = CELL_RE.match(text).groups()
+    return (col.upper() if col else None), (int(row) if row else None)
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self):
+        return self.tokens[self.i] if self.i < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        kind, text = self.peek()
+        if kind is None or (value is not None and text != value):
+            raise FormulaError(f"expected {value or 'token'}, got {text!r}")
+        self.i += 1
+        return kind, text
+
+    def binary(self, ops, sub):
+        node = sub()
+        while self.peek()[0] == "op" and self.peek()[1] in ops:
+            op = self.take()[1]
+            node = ("bin", op, node, sub())
+        return node
+
+    def expr(self):
+        return self.binary(COMPARISONS, self.concat)
+
+    def concat(self):
+        return self.binary({"&"}, self.additive)
+
+    def additive(self):
+        return self.binary({"+", "-"}, self.multiplicative)
+
+    def multiplicative(self):
+        return self.binary({"*", "/"}, self.power)
+
+    def power(self):
+        return self.binary({"^"}, self.unary)
+
+    def unary(self):
+        kind, text = self.peek()
+        if kind == "op" and text in ("-", "+"):
+            self.take()
+            operand = self.unary()
+            return ("neg", operand) if text == "-" else operand
+        node = self.primary()
+        while self.peek() == ("op", "%"):
+            self.take()
+            node = ("pct", node)
+        return node
+
+    def primary(self):
+        kind, text = self.take()
+        if kind == "num":
+            return ("num", float(text))
+        if kind == "str":
+            return ("str", text[1:-1].replace('""', '"').lower())
+        if kind == "ref":
+            sheet, cell = _split_sheet(text)
+            return ("ref", sheet) + _cell(cell)
+        if kind == "range":
+            sheet, rng = _split_sheet(text)
+            a, b = rng.split(":")
+            return ("range", sheet) + _cell(a) + _cell(b)
+        if kind == "name":
+            upper = text.upper()
+            if upper in ("TRUE", "FALSE"):
+                return ("bool", upper == "TRUE")
+            return ("name", upper)
+        if kind == "func":
+            name = text.upper()
+            if name.startswith("_XLFN."):
+                name = name[6:]
+            self.take("(")
+            args = []
+            if self.peek()[1] != ")":
+                while True:
+                    if self.peek()[1] in (",", ";", ")"):
+                        args.append(("empty",))
+                    else:
+                        args.append(self.expr())
+                    if self.peek()[1] in (",", ";"):
+                        self.take()
+                        continue
+                    break
+            self.take(")")
+            return ("func", name, tuple(args))
+        if text == "(":
+            node = self.expr()
+            self.take(")")
+            return node
+        raise FormulaError(f"unexpected {text!r}")
+
+
+def parse(text, allow_trailing=False):
+    """Parse a formula (leading "=" and CSE braces optional) into a raw AST.
+
+    With ``allow_trailing`` prose after a complete formula is ignored, which
+    model answers like "=SUM(A2:A10*B2:B10) entered as CSE" need.
+    """
+    text = (text or "").strip()
+    if text.startswith("{") and text.endswith("}"):
+        text = text[1:-1].strip()
+    if text.startswith("="):
+        text = text[1:]
+    if not text:
+        raise FormulaError("empty formula")
+
+    if allow_trailing:
+        # Tokenize only as far as the formula-like prefix goes
+        tokens, pos = [], 0
+        while pos < len(text):
+            m = TOKEN_RE.match(text, pos)
+            if not m:
+                break
+            pos = m.end()
+            if m.lastgroup != "ws":
+                tokens.append((m.lastgroup, m.group()))
+    else:
+        tokens = tokenize(text)
+
+    p = _Parser(tokens)
+    node = p.expr()
+    if p.i != len(tokens) and not allow_trailing:
+        raise FormulaError(f"unexpected {p.peek()[1]!r}")
+    return node
+
+
+# --- canonical form ---------------------------------------------------------
+
+def _flatten(op, node, out):
+    if node[0] == "comm" and node[1] == op:
+        out.extend(node[2])
+    else:
+        out.append(node)
+
+
+def _comm(op, operands):
+    flat = []
+    for o in operands:
+        _flatten(op, o, flat)
+    return ("comm", op, tuple(flat))
+
+
+def _criterion(node):
+    """SUMIFS-style criterion: plain equality criteria drop their leading '='."""
+    if node[0] == "str" and node[1].startswith("=") and not node[1].startswith("=="):
+        return ("str", node[1][1:])
+    return node
+
+
+def _as_pair(cond):
+    """(range, criterion) for a comparison against a range, else None."""
+    if cond[0] == "comm" and cond[1] == "=" and len(cond[2]) == 2:
+        a, b = cond[2]
+        if a[0] == "range" and b[0] != "range":
+            return ("pair", a, _criterion(b))
+        if b[0] == "range" and a[0] != "range":
+            return ("pair", b, _criterion(a))
+    if cond[0] == "bin" and cond[1] in COMPARISONS:
+        op, a, b = cond[1], cond[2], cond[3]
+        if b[0] == "range":
+            op, a, b = FLIPPED[op], b, a
+        if a[0] == "range" and b[0] in ("num", "str"):
+            value = b[1] if b[0] == "str" else f"{b[1]:g}"
+            return ("pair", a, ("str", f"{op}{value}".lower()))
+    return None
+
+
+def _ifs(name, target, pairs):
+    return ("func", name, (target, ("comm", "pairs", tuple(pairs))))
+
+
+def _conditional_sum(factors):
+    """SUMPRODUCT((A=x)*(C=y)*B) / SUMPRODUCT(--(A=x), B) -> SUMIFS / COUNTIFS."""
+    pairs, others = [], []
+    for f in factors:
+        pair = _as_pair(f)
+        (pairs if pair else others).append(pair or f)
+    if not pairs:
+        return None
+    if not others:
+        return _ifs("COUNTIFS", ("empty",), pairs)
+    if len(others) == 1 and others[0][0] == "range":
+        return _ifs("SUMIFS", others[0], pairs)
+    return None
+
+
+def _canon_func(name, args):
+    if name in ("SUMIF", "AVERAGEIF") and len(args) in (2, 3):
+        target = args[2] if len(args) == 3 else args[0]
+        return _ifs(name + "S", target, [("pair", args[0], _criterion(args[1]))])
+    if name == "COUNTIF" and len(args) == 2:
+        return _ifs("COUNTIFS", ("empty",), [("pair", args[0], _criterion(args[1]))])
+    if name in ("SUMIFS", "AVERAGEIFS") and len(args) >= 3 and len(args) % 2 == 1:
+        pairs = [("pair", args[i], _criterion(args[i + 1])) for i in range(1, len(args), 2)]
+        return _ifs(name, args[0], pairs)
+    if name == "COUNTIFS" and len(args) >= 2 and len(args) % 2 == 0:
+        pairs = [("pair", args[i], _criterion(args[i + 1])) for i in range(0, len(args), 2)]
+        return _ifs(name, ("empty",), pairs)
+
+    if name in ("SUMPRODUCT", "SUM"):
+        factors = []
+        if len(args) == 1 and args[0][0] == "comm" and args[0][1] == "*":
+            factors = list(args[0][2])
+        elif name == "SUMPRODUCT":
+            factors = list(args)
+        if factors:
+            conditional = _conditional_sum(factors)
+            if conditional:
+                return conditional
+            # SUM(A*B) as an array formula is SUMPRODUCT(A, B)
+            if len(factors) > 1:
+                return ("func", "SUMPRODUCT", (("comm", "args", tuple(factors)),))
+
+    if name in COMMUTATIVE_ARGS and len(args) > 1:
+        return ("func", name, (("comm", "args", tuple(args)),))
+    return ("func", name, tuple(args))
+
+
+def canonical(node):
+    tag = node[0]
+    if tag == "bin":
+        op, a, b = node[1], canonical(node[2]), canonical(node[3])
+        if op in ("+", "*", "=", "<>"):
+            return _comm(op, (a, b)) if op in ("+", "*") else ("comm", op, (a, b))
+        if op in ("<", "<="):
+            return ("bin", FLIPPED[op], b, a)
+        return ("bin", op, a, b)
+    if tag == "neg":
+        inner = canonical(node[1])
+        # Double negation only coerces booleans to numbers: --(A=x) ~ (A=x)
+        return inner[1] if inner[0] == "neg" else ("neg", inner)
+    if tag == "pct":
+        return ("pct", canonical(node[1]))
+    if tag == "func":
+        return _canon_func(node[1], tuple(canonical(a) for a in node[2]))
+    return node
+
+
+# --- equivalence --------------------------------------------------------------
+
+def _same_range(e, a):
+    _, se, c1, r1, c2, r2 = e
+    _, sa, d1, s1, d2, s2 = a
+    if se != sa:
+        return False
+    if c1 and d1 and r1 is None and s1 is not None:
+        # A whole column (B:B) in the model answer stands for any bounded range
+        # in that column; a whole column in the answer reads more than asked
+        return (c1, c2) == (d1, d2)
+    return (c1, r1, c2, r2) == (d1, s1, d2, s2)
+
+
+def _slot_kinds(node, kind="number", out=None):
+    """Placeholder name -> "array" / "number" / "value", from where it sits in the model answer."""
+    out = {} if out is None else out
+    tag = node[0]
+    if tag == "name":
+        if out.get(node[1]) != "array":
+            out[node[1]] = kind
+    elif tag == "func":
+        positions = ARRAY_ARGS.get(node[1], ())
+        for i, arg in enumerate(node[2]):
+            _slot_kinds(arg, "array" if positions is None or i in positions else "number", out)
+    elif tag == "pair":
+        _slot_kinds(node[1], "array", out)
+        _slot_kinds(node[2], "value", out)
+    elif tag in ("comm", "bin"):
+        for child in node[2] if tag == "comm" else node[2:]:
+            _slot_kinds(child, kind, out)
+    elif tag in ("neg", "pct"):
+        _slot_kinds(node[1], kind, out)
+    return out
+
+
+def _nodes(node):
+    yield node
+    for x in node[1:]:
+        if isinstance(x, tuple) and x and isinstance(x[0], tuple):
+            for child in x:
+                yield from _nodes(child)
+        elif isinstance(x, tuple) and x:
+            yield from _nodes(x)
+
+
+def _column(letters):
+    return (len(letters), letters)
+
+
+def _inside(ref, rng):
+    _, sheet, col, row = ref
+    _, sr, c1, r1, c2, r2 = rng
+    if sheet != sr or col is None or row is None:
+        return False
+    cols = c1 is None or _column(c1) <= _column(col) <= _column(c2)
+    rows = r1 is None or r1 <= row <= r2
+    return cols and rows
+
+
+def _fits(kind, a, ranges):
+    """Whether answer node ``a`` can stand in for a placeholder of ``kind``."""
+    if a[0] == "name":
+        return True
+    tags = {n[0] for n in _nodes(a)}
+    if kind == "array":
+        return "str" not in tags
+    if "range" in tags or (kind == "number" and "str" in tags):
+        return False
+    # A cell of the data range itself (LARGE(A1:A50, A1)) is not a parameter
+    return not any(n[0] == "ref" and _inside(n, r) for n in _nodes(a) for r in ranges)
+
+
+# Internal binding keys (names never start with a space): the row span that
+# whole columns in the model answer were matched to, the answer ranges already
+# matched literally, the model answer's placeholder kinds, the answer's ranges,
+# and whether a placeholder was bound to something of the wrong kind
+_ROWS = " rows"
+_USED = " used"
+_KINDS = " kinds"
+_RANGES = " ranges"
+_UNSURE = " unsure"
+
+
+def _placeholders(bind):
+    return {k: v for k, v in bind.items() if not k.startswith(" ")}
+
+
+def _matches(e, a, bind):
+    """Yield every set of placeholder bindings under which expected ``e`` matches answer ``a``."""
+    if e[0] == "name":
+        if a == e:
+            yield bind
+        elif e[1] in bind:
+            if _unify(bind[e[1]], a) is not None:
+                yield bind
+        # two placeholders must not stand for the same thing, nor for a range the formula already uses
+        elif a not in bind.get(_USED, ()) and all(_unify(v, a) is None for v in _placeholders(bind).values()):
+            bound = dict(bind, **{e[1]: a})
+            if not _fits(bind.get(_KINDS, {}).get(e[1], "number"), a, bind.get(_RANGES, ())):
+                bound[_UNSURE] = True
+            yield bound
+        return
+
+    if e[0] != a[0]:
+        return
+    if e[0] == "range":
+        if not _same_range(e, a) or a in _placeholders(bind).values():
+            return
+        if e[3] is None and e[2] and a[3] is not None:
+            # B:B ~ B2:B100 only if every whole column maps to the same rows
+            rows = (a[3], a[5])
+            if bind.get(_ROWS, rows) != rows:
+                return
+            bind = dict(bind, **{_ROWS: rows})
+        yield dict(bind, **{_USED: bind.get(_USED, frozenset()) | {a}})
+        return
+    if e[0] == "num":
+        if abs(e[1] - a[1]) < 1e-9:
+            yield bind
+        return
+    if e[0] == "comm":
+        if e[1] != a[1] or len(e[2]) != len(a[2]):
+            return
+        orders = itertools.permutations(a[2]) if len(a[2]) <= MAX_PERMUTED else [a[2]]
+        for order in orders:
+            yield from _matches_seq(e[2], order, bind)
+        return
+    if len(e) != len(a):
+        return
+
+    # Scalars (tags, names, cells) must be equal; child nodes and argument lists must match
+    xs, ys = [], []
+    for x, y in zip(e[1:], a[1:]):
+        if isinstance(x, tuple) and (not x or isinstance(x[0], tuple)):
+            if not isinstance(y, tuple) or len(x) != len(y):
+                return
+            xs.extend(x)
+            ys.extend(y)
+        elif isinstance(x, tuple):
+            if not (isinstance(y, tuple) and y):
+                return
+            xs.append(x)
+            ys.append(y)
+        elif x != y:
+            return
+    yield from _matches_seq(xs, ys, bind)
+
+
+def _matches_seq(xs, ys, bind):
+    if not xs:
+        yield bind
+        return
+    for b in _matches(xs[0], ys[0], bind):
+        yield from _matches_seq(xs[1:], ys[1:], b)
+
+
+def _unify(e, a, bind=None):
+    return next(_matches(e, a, bind or {}), None)
+
+
+class CompiledFormula:
+    __slots__ = ("source", "ast", "kinds")
+
+    def __init__(self, source, ast):
+        self.source = source
+        self.ast = ast
+        self.kinds = _slot_kinds(ast)
+
+
+def compile_expected(text):
+    """Precompile a model answer; None when it isn't a parseable formula."""
+    if not text or not text.strip().startswith(("=", "{=")):
+        return None
+    try:
+        return CompiledFormula(text, canonical(parse(text, allow_trailing=True)))
+    except (FormulaError, RecursionError):
+        return None
+
+
+def equivalent(compiled, answer):
+    """True/False when the answer parses, None when it can't be judged."""
+    try:
+        ast = canonical(parse(answer))
+    except (FormulaError, RecursionError):
+        return None
+    start = {_KINDS: compiled.kinds, _RANGES: tuple(n for n in _nodes(ast) if n[0] == "range")}
+    unsure = False
+    for bind in itertools.islice(_matches(compiled.ast, ast, start), MAX_MATCHES):
+        if not bind.get(_UNSURE):
+            return True
+        unsure = True
+    return None if unsure else False
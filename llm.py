@@ -0,0 +1,339 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+
+from dotenv import load_dotenv
+
+import metrics
+
+# Load environment variables
+load_dotenv()
+GROQ_KEY = os.environ.get("GROQ_API_KEY")
+# Point GROQ_BASE_URL at a local fake chat-completions server to test without Groq
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL") or None
+LLM_MODEL = os.environ.get("LLM_MODEL", "llama-3.1-8b-instruct")
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "16"))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "20"))
+# Provider quotas; 0 disables the limit
+LLM_RPM = int(os.environ.get("LLM_RPM", "0"))
+LLM_TPM = int(os.environ.get("LLM_TPM", "0"))
+# Total budget per call (queueing + retries + backoff), in seconds
+LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", "25"))
+LLM_RETRIES = int(os.environ.get("LLM_RETRIES", "2"))
+LLM_RETRY_BASE = float(os.environ.get("LLM_RETRY_BASE", "0.25"))
+# Consecutive provider failures that open the breaker, and how long it stays open
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", "30"))
+
+# Lower value is served first: live candidate scoring, then reports, then regrades
+PRIORITIES = {"live": 0, "report": 1, "batch": 2}
+
+# The groq SDK (and its httpx/pydantic import tree) is loaded on first use,
+# not at import time, to keep cold starts short
+_client = None
+_retryable = None
+
+
+def client():
+    global _client, _retryable
+    if _client is None and GROQ_KEY:
+        from groq import APIConnectionError, APITimeoutError, AsyncClient, InternalServerError, RateLimitError
+
+        # Throttling, 5xx, timeouts and connection failures say the provider is unhealthy
+        _retryable = (RateLimitError, InternalServerError, APIConnectionError, APITimeoutError, asyncio.TimeoutError)
+        _client = AsyncClient(api_key=GROQ_KEY, base_url=GROQ_BASE_URL, timeout=LLM_TIMEOUT, max_retries=0)
+    return _client
+
+
+class LLMUnavailable(RuntimeError):
+    """Raised without calling the provider (breaker open, or deadline spent queueing)."""
+
+
+def enabled():
+    return bool(GROQ_KEY)
+
+
+def _estimate_tokens(prompt, max_tokens):
+    return len(prompt) // 4 + max_tokens
+
+
+def _record_usage(kind, usage):
+    if usage is None:
+        return
+    metrics.LLM_TOKENS.inc("prompt", amount=usage.prompt_tokens or 0)
+    metrics.LLM_TOKENS.inc("completion", amount=usage.completion_tokens or 0)
+    metrics.LLM_PROMPT_TOKENS.observe(kind, value=usage.prompt_tokens or 0)
+
+
+# ✅ Token buckets for requests and tokens per minute
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.stamp = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_time(self, n):
+        """Seconds until ``n`` units are available (0 when unlimited or ready)."""
+        if not self.capacity:
+            return 0.0
+        self._refill()
+        n = min(n, self.capacity)
+        return 0.0 if self.level >= n else (n - self.level) / self.rate
+
+    def take(self, n):
+        if self.capacity:
+            self.level -= n
+
+    def adjust(self, estimated, actual):
+        # Settle the estimate once the provider reports real usage (may go negative)
+        if self.capacity:
+            self.level += estimated - actual
+
+
+_requests = TokenBucket(LLM_RPM)
+_tokens = TokenBucket(LLM_TPM)
+
+
+# ✅ Circuit breaker
+# closed -> open after LLM_BREAKER_FAILURES consecutive provider failures; after
+# LLM_BREAKER_COOLDOWN one probe call is let through (half-open) and its
+# outcome closes or re-opens the breaker. While open, calls fail immediately and
+# callers use their rule-based / fallback result.
+breaker = {"state": "closed", "failures": 0, "opened_at": 0.0, "probing": False, "opens": 0, "short_circuited": 0}
+
+
+def _breaker_allow():
+    if breaker["state"] == "closed":
+        return True
+    if breaker["state"] == "open" and time.monotonic() - breaker["opened_at"] >= LLM_BREAKER_COOLDOWN:
+        breaker["state"] = "half_open"
+    if breaker["state"] == "half_open" and not breaker["probing"]:
+        breaker["probing"] = True
+        return True
+    breaker["short_circuited"] += 1
+    return False
+
+
+def _breaker_success():
+    breaker.update(state="closed", failures=0, probing=False)
+
+
+def _breaker_failure():
+    breaker["failures"] += 1
+    breaker["probing"] = False
+    if breaker["state"] == "half_open" or breaker["failures"] >= LLM_BREAKER_FAILURES:
+        if breaker["state"] != "open":
+            breaker["opens"] += 1
+        breaker.update(state="open", opened_at=time.monotonic())
+
+
+# ✅ Priority admission (one scheduler per event loop; asyncio futures are loop-bound)
+class _Scheduler:
+    def __init__(self, loop):
+        self.loop = loop
+        self.in_flight = 0
+        self.waiters = []
+        self.seq = itertools.count()
+        self.timer = None
+
+    async def acquire(self, priority, tokens, deadline):
+        fut = self.loop.create_future()
+        heapq.heappush(self.waiters, (priority, next(self.seq), fut, tokens))
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                # Admitted just as the deadline hit; hand the slot back
+                self.release()
+            fut.cancel()
+            raise LLMUnavailable("deadline_exceeded_in_queue")
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                self.release()
+            fut.cancel()
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        while self.waiters and self.in_flight < LLM_CONCURRENCY:
+            _, _, fut, tokens = self.waiters[0]
+            if fut.done():
+                heapq.heappop(self.waiters)
+                continue
+            # Strict priority: a throttled head-of-line request is not overtaken
+            wait = max(_requests.wait_time(1), _tokens.wait_time(tokens))
+            if wait > 0:
+                self.timer = self.loop.call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self.waiters)
+            _requests.take(1)
+            _tokens.take(tokens)
+            self.in_flight += 1
+            fut.set_result(None)
+
+
+_schedulers = {}
+
+
+def _scheduler():
+    loop = asyncio.get_running_loop()
+    s = _schedulers.get(loop)
+    if s is None:
+        s = _schedulers[loop] = _Scheduler(loop)
+    return s
+
+
+def snapshot():
+    queued = sum(len(s.waiters) for s in _schedulers.values())
+    in_flight = sum(s.in_flight for s in _schedulers.values())
+    return {
+        "breaker_open": int(breaker["state"] != "closed"),
+        "breaker_opens": breaker["opens"],
+        "short_circuited": breaker["short_circuited"],
+        "consecutive_failures": breaker["failures"],
+        "queued": queued,
+        "in_flight": in_flight,
+    }
+
+
+def _retry_delay(attempt, error):
+    retry_after = getattr(getattr(error, "response", None), "headers", {}).get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    # Full jitter keeps synchronized callers from retrying in lockstep
+    return random.uniform(0, min(4.0, LLM_RETRY_BASE * 2 ** attempt))
+
+
+async def _call(kind, priority, prompt, max_tokens, deadline, request, keep_slot=False):
+    """Run ``request()`` through the breaker, scheduler and retry loop.
+
+    With ``keep_slot`` the concurrency slot stays taken after success (for a
+    stream still being read) and the caller must call ``_scheduler().release()``.
+    """
+    if client() is None:
+        raise RuntimeError("no_groq_key")
+
+    deadline = time.monotonic() + (LLM_DEADLINE if deadline is None else deadline)
+    rank = PRIORITIES.get(priority, PRIORITIES["live"])
+    estimated = _estimate_tokens(prompt, max_tokens)
+    scheduler = _scheduler()
+
+    for attempt in range(LLM_RETRIES + 1):
+        if not _breaker_allow():
+            metrics.LLM_ERRORS.inc("circuit_open")
+            raise LLMUnavailable("circuit_open")
+        probe = breaker["state"] == "half_open"
+        try:
+            try:
+                await scheduler.acquire(rank, estimated, deadline)
+            except LLMUnavailable:
+                metrics.LLM_ERRORS.inc("deadline_exceeded")
+                raise
+
+            release = True
+            try:
+                remaining = deadline - time.monotonic()
+                with metrics.LLM_SECONDS.time(kind):
+                    response = await asyncio.wait_for(request(), timeout=min(LLM_TIMEOUT, max(0.1, remaining)))
+            except _retryable as e:
+                metrics.LLM_ERRORS.inc(type(e).__name__)
+                _breaker_failure()
+                delay = _retry_delay(attempt, e)
+                if attempt == LLM_RETRIES or time.monotonic() + delay >= deadline:
+                    raise
+            except Exception as e:
+                # Bad request, auth, etc.: the provider is up, retrying won't help
+                metrics.LLM_ERRORS.inc(type(e).__name__)
+                _breaker_success()
+                raise
+            else:
+                _breaker_success()
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    _tokens.adjust(estimated, usage.total_tokens or estimated)
+                release = not keep_slot
+                return response
+            finally:
+                if release:
+                    scheduler.release()
+        finally:
+            # A cancelled or queued-out probe must not leave the breaker half-open forever
+            if probe:
+                breaker["probing"] = False
+
+        metrics.LLM_RETRIES.inc(kind)
+        await asyncio.sleep(delay)
+
+
+# ✅ Bounded, rate-limited chat completion
+async def chat(prompt, max_tokens, temperature=0.0, priority="live", deadline=None):
+    """Return the completion text; raises on provider error, open breaker or deadline."""
+
+    def request():
+        return client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+
+    response = await _call("chat", priority, prompt, max_tokens, deadline, request)
+    _record_usage("chat", response.usage)
+    return (response.choices[0].message.content or "").strip()
+
+
+# ✅ Streaming chat completion (yields text deltas)
+# Only opening the stream is retried; once text has been yielded a failure is
+# raised to the caller.
+async def stream_chat(prompt, max_tokens, temperature=0.0, priority="report", deadline=None):
+    def request():
+        return client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+        )
+
+    stream = await _call("stream_open", priority, prompt, max_tokens, deadline, request, keep_slot=True)
+    started = time.perf_counter()
+    try:
+        chunks = stream.__aiter__()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), timeout=LLM_TIMEOUT)
+            except StopAsyncIteration:
+                break
+            # Groq reports usage on the final chunk under x_groq
+            x_groq = getattr(chunk, "x_groq", None)
+            _record_usage("stream", getattr(chunk, "usage", None) or getattr(x_groq, "usage", None))
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+    except Exception as e:
+        metrics.LLM_ERRORS.inc(type(e).__name__)
+        if isinstance(e, _retryable):
+            _breaker_failure()
+        raise
+    finally:
+        _scheduler().release()
+        metrics.LLM_SECONDS.observe("stream", value=time.perf_counter() - started)
@@ -0,0 +1,126 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# ✅ In-process Prometheus metrics
+# Counters and histograms are plain dicts keyed by label values and rendered
+# in the Prometheus text format at GET /metrics. Values are per process; with
+# several uvicorn workers, scrape each one (or run a single worker).
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000)
+
+_lock = threading.Lock()
+_registry = []
+_gauges = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(value):
+    return "+Inf" if value == float("inf") else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.values = {}
+        _registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with _lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, values)} {_num(total)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self.series = {}
+        _registry.append(self)
+
+    def observe(self, *label_values, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            s = self.series.get(label_values)
+            if s is None:
+                s = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            s[0][i] += 1
+            s[1] += value
+            s[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(*label_values, value=time.perf_counter() - started)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total, n) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = 'le="%s"' % _num(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labels, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, values)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labels, values)} {n}")
+        return lines
+
+
+def gauges(prefix, snapshot):
+    """Export every numeric field of ``snapshot()`` as ``<prefix>_<field>`` at scrape time."""
+    _gauges.append((prefix, snapshot))
+
+
+def render():
+    with _lock:
+        lines = [line for metric in _registry for line in metric.render()]
+    for prefix, snapshot in _gauges:
+        for key, value in sorted(snapshot().items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"# TYPE {prefix}_{key} gauge")
+                lines.append(f"{prefix}_{key} {_num(value)}")
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time to response headers (streaming bodies excluded).",
+    ("method", "route"),
+)
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Time spent in each hot-path stage.", ("stage",))
+LLM_SECONDS = Histogram("llm_request_duration_seconds", "LLM call latency.", ("kind",))
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens reported by the provider.", ("type",))
+LLM_PROMPT_TOKENS = Histogram("llm_prompt_tokens", "Prompt size per LLM call.", ("kind",), buckets=TOKEN_BUCKETS)
+LLM_RETRIES = Counter("llm_retries_total", "LLM calls retried after a retryable failure.", ("kind",))
+LLM_ERRORS = Counter("llm_errors_total", "Failed LLM calls by exception type.", ("type",))
+FALLBACKS = Counter(
+    "llm_fallbacks_total",
+    "Results produced without the LLM (score_default is the flat 3.0 score).",
+    ("kind",),
+)
+
+
+def stage(name):
+    """``with metrics.stage("db_insert"): ...`` records the block's wall time."""
+    return STAGE_SECONDS.time(name)
@@ -0,0 +1,114 @@
+import asyncio
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# ✅ Final report PDF rendering
+# ReportLab layout is CPU-bound, so it runs in a small process pool rather than
+# on the event loop; rendered bytes are cached per report version (reports.py).
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", "2"))
+# Answers longer than this are cut in the PDF (the full text stays in the JSON report)
+PDF_ANSWER_CHARS = int(os.environ.get("PDF_ANSWER_CHARS", "2000"))
+
+PAGE_SIZE = (612.0, 792.0)  # US letter, in points
+MARGIN = 50
+BOTTOM = 60
+FONT = "Helvetica"
+BOLD = "Helvetica-Bold"
+
+_pool = None
+
+
+def _text(value):
+    if value is None:
+        return "N/A"
+    if isinstance(value, (list, tuple)):
+        return "; ".join(str(v) for v in value)
+    return str(value)
+
+
+class _Page:
+    """Canvas wrapper that wraps lines to the page width and starts new pages."""
+
+    def __init__(self, c):
+        from reportlab.lib.utils import simpleSplit
+
+        self.split = simpleSplit
+        self.c = c
+        self.width, self.height = PAGE_SIZE
+        self.y = self.height - MARGIN
+
+    def space(self, points):
+        self.y -= points
+
+    def write(self, text, size=10, font=FONT, indent=0, leading=None):
+        leading = leading or size * 1.35
+        x = MARGIN + indent
+        max_width = self.width - MARGIN - x
+        for paragraph in _text(text).splitlines() or [""]:
+            for line in self.split(paragraph, font, size, max_width) or [""]:
+                if self.y < BOTTOM:
+                    self.c.showPage()
+                    self.y = self.height - MARGIN
+                self.c.setFont(font, size)
+                self.c.drawString(x, self.y, line)
+                self.y -= leading
+
+
+def render(report):
+    """PDF bytes for a final report dict (as returned by /final_report)."""
+    # ReportLab is imported in the worker processes only, off the API's startup path
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=PAGE_SIZE, pageCompression=1)
+    c.setTitle("Excel Mock Interview Report")
+    page = _Page(c)
+
+    page.write("Excel Mock Interview Report", size=16, font=BOLD)
+    page.space(8)
+    page.write(f"Interview ID: {report.get('interview_id', 'N/A')}", size=11)
+    page.write(f"Overall Score: {_text(report.get('overall'))}", size=11)
+    if report.get("pending"):
+        page.write(f"Answers still being graded: {report['pending']}", size=11)
+    page.space(10)
+
+    for label, key in (("Summary", "summary_text"), ("Strengths", "strengths"), ("Weaknesses", "weaknesses")):
+        page.write(f"{label}:", size=11, font=BOLD)
+        page.write(report.get(key), indent=10)
+        page.space(6)
+
+    page.space(10)
+    page.write("Detailed Question-wise Report:", size=12, font=BOLD)
+    page.space(4)
+    for idx, qa in enumerate(report.get("questions", []), 1):
+        answer = _text(qa.get("your_answer"))
+        if len(answer) > PDF_ANSWER_CHARS:
+            answer = answer[:PDF_ANSWER_CHARS] + " …"
+        score = "pending" if qa.get("status") == "pending" else _text(qa.get("score"))
+        page.write(f"Q{idx}. {_text(qa.get('question'))}", size=9, font=BOLD, indent=10)
+        page.write(f"Your Answer: {answer}", size=9, indent=20)
+        page.write(f"Correct Answer: {_text(qa.get('correct_answer'))}", size=9, indent=20)
+        page.write(f"Score: {score}", size=9, indent=20)
+        page.space(8)
+
+    c.save()
+    return buffer.getvalue()
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _pool
+
+
+async def render_async(report):
+    return await asyncio.get_running_loop().run_in_executor(_executor(), render, report)
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,70 @@
+import collections
+import os
+import sys
+import threading
+import time
+import uuid
+
+# ✅ Per-request sampling profiler
+# Off unless PROFILE_REQUESTS=1. A request sent with "X-Profile: 1" is then
+# sampled every PROFILE_INTERVAL_MS while it runs, and the folded stacks
+# (flamegraph.pl / speedscope input) are written to PROFILE_DIR; the file name
+# comes back in the X-Profile-File response header. All threads are sampled
+# (the event loop and the threadpool doing SQLite work), so profile on a quiet
+# instance.
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS", "0") == "1"
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_MAX_DEPTH = 64
+
+
+class Sampler:
+    def __init__(self, interval=PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def write(self, label):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        safe = "".join(c if c.isalnum() else "_" for c in label).strip("_")[:60]
+        path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}_{safe}_{uuid.uuid4().hex[:6]}.folded")
+        with open(path, "w") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        return path
+
+
+def for_request(headers):
+    """Started Sampler when profiling is enabled and requested, else None."""
+    if PROFILE_REQUESTS and headers.get("x-profile") == "1":
+        return Sampler().start()
+    return None
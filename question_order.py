@@ -0,0 +1,74 @@
+import math
+import os
+import zlib
+
+# ✅ Server-side question order
+# Each interview keeps a small cursor state (interviews.question_state): how
+# many questions it has taken from each difficulty band, the ids already asked,
+# its current level and a per-interview seed. The k-th pick from a band of n
+# ids is ids[(a*k + b) % n], with a coprime to n, so picks never repeat and cost
+# O(1) however large the bank is.
+#   QUESTION_ORDER=fixed    - catalog order (difficulty, id), same for everyone
+#   QUESTION_ORDER=shuffle  - easiest band first, seeded order inside each band
+#   QUESTION_ORDER=adaptive - shuffled, moving a level up after a score of at
+#                             least ADAPTIVE_UP_SCORE and down after one of at
+#                             most ADAPTIVE_DOWN_SCORE
+QUESTION_ORDER = os.environ.get("QUESTION_ORDER", "fixed")
+QUESTION_SEED = os.environ.get("QUESTION_SEED", "")
+ADAPTIVE_UP_SCORE = float(os.environ.get("ADAPTIVE_UP_SCORE", "4"))
+ADAPTIVE_DOWN_SCORE = float(os.environ.get("ADAPTIVE_DOWN_SCORE", "2"))
+
+
+def new_state(interview_id):
+    seed = zlib.crc32(f"{QUESTION_SEED}:{interview_id}".encode("utf-8"))
+    return {"seed": seed, "level": None, "taken": {}, "asked": []}
+
+
+def _permute(k, n, seed):
+    """Position of the k-th pick in a band of n (a bijection on 0..n-1)."""
+    if QUESTION_ORDER == "fixed" or n == 1:
+        return k
+    a = 1 + (seed >> 8) % (n - 1)
+    while math.gcd(a, n) != 1:
+        a += 1
+    return (a * k + seed) % n
+
+
+def _levels(cat, state, last_score):
+    """Difficulty levels to try, preferred first."""
+    levels = cat.levels
+    if QUESTION_ORDER != "adaptive" or state["level"] not in levels:
+        return levels
+    i = levels.index(state["level"])
+    if last_score is not None and last_score >= ADAPTIVE_UP_SCORE:
+        i = min(i + 1, len(levels) - 1)
+    elif last_score is not None and last_score <= ADAPTIVE_DOWN_SCORE:
+        i = max(i - 1, 0)
+    # Nearest levels next, harder before easier
+    order = [i]
+    for step in range(1, len(levels)):
+        order += [j for j in (i + step, i - step) if 0 <= j < len(levels)]
+    return tuple(levels[j] for j in order)
+
+
+def advance(cat, state, last_score=None):
+    """``(question, state)`` for the next unasked question, or ``(None, state)`` when none is left."""
+    asked = set(state["asked"])
+    for level in _levels(cat, state, last_score):
+        ids, key = cat.bands[level], str(level)
+        k = state["taken"].get(key, 0)
+        # Only loops past ids asked before the bank changed mid-interview
+        while k < len(ids):
+            question_id = ids[_permute(k, len(ids), state["seed"])]
+            k += 1
+            if question_id not in asked:
+                state["taken"][key] = k
+                state["asked"].append(question_id)
+                state["level"] = level
+                return cat.get(question_id), state
+        state["taken"][key] = k
+    return None, state
+
+
+def needs_last_score():
+    return QUESTION_ORDER == "adaptive"
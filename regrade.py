@@ -0,0 +1,200 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from fastapi.concurrency import run_in_threadpool
+
+import analytics
+import app
+import db
+import db_init
+import evaluator_store
+import running_summary
+
+# ✅ Offline regrade job
+# Re-scores stored responses with the current rules, prompt and blend weights.
+# Workbook uploads (responses.source='workbook') are left alone: their
+# response_text is only a summary of a file that is no longer kept.
+# Rows are read in rowid order, REGRADE_CHUNK at a time; each chunk is written
+# with executemany together with the job checkpoint in one transaction, so an
+# interrupted run resumes after the last committed chunk (--resume JOB_ID).
+# The running summaries of the chunk's interviews are recomputed in that same
+# transaction, so a report built between two chunks never pairs new scores with
+# an old breakdown.
+REGRADE_CHUNK = int(os.environ.get("REGRADE_CHUNK", "200"))
+
+
+def _epoch(value):
+    if value is None:
+        return None
+    if value.isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp())
+
+
+def _where(filters):
+    clauses, params = ["COALESCE(status, 'scored') != 'pending'", "source IS NULL"], []
+    if filters.get("question_id") is not None:
+        clauses.append("question_id=?")
+        params.append(filters["question_id"])
+    if filters.get("interview_id"):
+        clauses.append("interview_id=?")
+        params.append(filters["interview_id"])
+    if filters.get("since") is not None:
+        clauses.append("created_at>=?")
+        params.append(filters["since"])
+    if filters.get("until") is not None:
+        clauses.append("created_at<?")
+        params.append(filters["until"])
+    return " AND ".join(clauses), params
+
+
+def create_job(filters):
+    job_id = str(uuid.uuid4())
+    now = int(time.time())
+    with db.connection() as conn:
+        conn.execute(
+            "INSERT INTO regrade_jobs (id,filters,last_rowid,processed,updated,failed,status,created_at,updated_at) VALUES (?,?,0,0,0,0,'running',?,?)",
+            (job_id, json.dumps(filters), now, now),
+        )
+        conn.commit()
+    return job_id
+
+
+def load_job(job_id):
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM regrade_jobs WHERE id=?", (job_id,))
+        row = cur.fetchone()
+    return dict(row) if row else None
+
+
+def fetch_chunk(filters, after_rowid, limit):
+    where, params = _where(filters)
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"SELECT rowid, id, interview_id, question_id, response_text, score, rule_score, llm_score FROM responses WHERE rowid>? AND {where} ORDER BY rowid LIMIT ?",
+            [after_rowid] + params + [limit],
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+def write_chunk(job_id, last_rowid, updates, processed, failed):
+    """Apply one chunk of new scores and advance the checkpoint atomically.
+
+    ``updates`` are ``(old_row, score, evaluator)``; analytics swap the old grade for the new one.
+    The running summaries of the interviews involved are recomputed in the same transaction.
+    """
+    typed = [evaluator_store.columns(evaluator) for _, _, evaluator in updates]
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.executemany(
+            """
+            UPDATE responses SET score=?, rule_score=?, llm_score=?, llm_rationale=?, func_hits=?, source=?,
+                   evaluator_z=?
+            WHERE id=?
+            """,
+            [
+                (score, *cols, evaluator_store.pack(evaluator), r["id"])
+                for (r, score, evaluator), cols in zip(updates, typed)
+            ],
+        )
+        # The new evaluator replaces any archived copy of the old one
+        cur.executemany("DELETE FROM response_archive WHERE response_id=?", [(r["id"],) for r, _, _ in updates])
+        analytics.record(cur, [(r["question_id"], r["score"], r["rule_score"], r["llm_score"]) for r, _, _ in updates], sign=-1)
+        analytics.record(
+            cur, [(r["question_id"], score, cols[0], cols[1]) for (r, score, _), cols in zip(updates, typed)]
+        )
+        # Summaries hold score totals and rationales, both of which a regrade rewrites
+        for interview_id in {r["interview_id"] for r, _, _ in updates}:
+            running_summary.recompute(cur, interview_id)
+        cur.execute(
+            """
+            UPDATE regrade_jobs SET last_rowid=?, processed=processed+?, updated=updated+?,
+                   failed=failed+?, updated_at=? WHERE id=?
+            """,
+            (last_rowid, processed, len(updates), failed, int(time.time()), job_id),
+        )
+        conn.commit()
+
+
+def finish_job(job_id):
+    with db.connection() as conn:
+        conn.execute("UPDATE regrade_jobs SET status='done', updated_at=? WHERE id=?", (int(time.time()), job_id))
+        conn.commit()
+
+
+async def run(job_id, chunk=REGRADE_CHUNK, pack=app.GRADE_PACK_SIZE, concurrency=app.GRADE_BATCH_CONCURRENCY, dry_run=False):
+    job = load_job(job_id)
+    filters = json.loads(job["filters"])
+    last_rowid = job["last_rowid"]
+
+    while True:
+        rows = fetch_chunk(filters, last_rowid, chunk)
+        if not rows:
+            break
+
+        questions = await run_in_threadpool(app.load_questions, [r["question_id"] for r in rows])
+        items = [(qd, r["response_text"]) for qd, r in zip(questions, rows)]
+        # Regrades queue behind live scoring and reports in the LLM gateway
+        graded = await app.grade_many(items, pack=pack, concurrency=concurrency, priority="batch")
+
+        updates, failed = [], 0
+        for r, (score, evaluator) in zip(rows, graded):
+            # Keep the old grade rather than overwrite it with a fallback score
+            if (evaluator.get("llm") or {}).get("error"):
+                failed += 1
+                continue
+            updates.append((r, score, evaluator))
+
+        last_rowid = rows[-1]["rowid"]
+        if dry_run:
+            print(f"… would update {len(updates)} of {len(rows)} rows (failed {failed})")
+        else:
+            write_chunk(job_id, last_rowid, updates, len(rows), failed)
+            print(f"✅ chunk up to rowid {last_rowid}: {len(updates)} updated, {failed} failed")
+
+    finish_job(job_id)
+    return load_job(job_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regrade stored responses")
+    parser.add_argument("--question-id", type=int)
+    parser.add_argument("--interview-id")
+    parser.add_argument("--since", help="epoch seconds or ISO date (UTC)")
+    parser.add_argument("--until", help="epoch seconds or ISO date (UTC), exclusive")
+    parser.add_argument("--resume", metavar="JOB_ID", help="continue an interrupted job")
+    parser.add_argument("--chunk", type=int, default=REGRADE_CHUNK)
+    parser.add_argument("--pack", type=int, default=app.GRADE_PACK_SIZE)
+    parser.add_argument("--concurrency", type=int, default=app.GRADE_BATCH_CONCURRENCY)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    db_init.init_db()
+    if args.resume:
+        job_id = args.resume
+        if not load_job(job_id):
+            sys.exit(f"❌ unknown regrade job {job_id}")
+    else:
+        filters = {
+            "question_id": args.question_id,
+            "interview_id": args.interview_id,
+            "since": _epoch(args.since),
+            "until": _epoch(args.until),
+        }
+        job_id = create_job(filters)
+    print("🔁 regrade job", job_id)
+
+    job = asyncio.run(run(job_id, args.chunk, args.pack, args.concurrency, args.dry_run))
+    print(f"✅ {job['status']}: processed {job['processed']}, updated {job['updated']}, failed {job['failed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import time
+
+import db
+
+# ✅ Materialized final reports
+# A report is stored in the reports table together with the version of the
+# responses it was built from. The version changes whenever a response is
+# added, graded or regraded, so a stored report is reused until then. The
+# rendered PDF is kept on the same row, tagged with the version it was built from.
+
+
+def report_version(interview_id):
+    """Cheap fingerprint of an interview's responses (uses idx_responses_interview).
+
+    Nothing in it depends on rowids, which compact.py renumbers.
+    """
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT COUNT(1), MAX(created_at), TOTAL(score),
+                   SUM(CASE WHEN status='pending' THEN 1 ELSE 0 END)
+            FROM responses WHERE interview_id=?
+            """,
+            (interview_id,),
+        )
+        n, last, total, pending = cur.fetchone()
+    if not n:
+        return None
+    raw = f"{interview_id}:{n}:{last}:{total}:{pending or 0}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def _text(value):
+    return value if isinstance(value, str) or value is None else json.dumps(value)
+
+
+def summary_columns(report):
+    """The report's summary fields as stored in their own columns."""
+    return {
+        "summary_text": _text(report.get("summary_text")),
+        "strengths": _text(report.get("strengths")),
+        "weaknesses": _text(report.get("weaknesses")),
+        "overall_score": report.get("overall"),
+    }
+
+
+def etag_for(version):
+    return f'"{version}"'
+
+
+def load_cached(interview_id, version):
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT payload FROM reports WHERE interview_id=? AND version=?",
+            (interview_id, version),
+        )
+        row = cur.fetchone()
+    return json.loads(row["payload"]) if row else None
+
+
+def store(interview_id, version, report):
+    with db.connection() as conn:
+        conn.execute(
+            """
+            INSERT INTO reports (interview_id,summary_text,strengths,weaknesses,overall_score,version,payload,created_at)
+            VALUES (?,?,?,?,?,?,?,?)
+            ON CONFLICT(interview_id) DO UPDATE SET
+                summary_text=excluded.summary_text,
+                strengths=excluded.strengths,
+                weaknesses=excluded.weaknesses,
+                overall_score=excluded.overall_score,
+                version=excluded.version,
+                payload=excluded.payload,
+                created_at=excluded.created_at
+            """,
+            (
+                interview_id,
+                *summary_columns(report).values(),
+                version,
+                json.dumps(report),
+                int(time.time()),
+            ),
+        )
+        conn.commit()
+
+
+def load_pdf(interview_id, version):
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT pdf FROM reports WHERE interview_id=? AND pdf_version=?",
+            (interview_id, version),
+        )
+        row = cur.fetchone()
+    return bytes(row["pdf"]) if row and row["pdf"] is not None else None
+
+
+def store_pdf(interview_id, version, pdf):
+    """Cache PDF bytes; only attaches to a report materialized at the same version."""
+    with db.connection() as conn:
+        conn.execute(
+            "UPDATE reports SET pdf=?, pdf_version=? WHERE interview_id=? AND version=?",
+            (pdf, version, interview_id, version),
+        )
+        conn.commit()
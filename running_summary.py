@@ -0,0 +1,155 @@
+import json
+import os
+import time
+
+import catalog
+import db
+
+# ✅ Per-interview running state
+# Updated in the same transaction as every scored response so the final report
+# needs only this compact state (score aggregates per qtype/difficulty plus a
+# few rolling strength/weakness notes) instead of the whole transcript.
+RUNNING_NOTES_KEPT = int(os.environ.get("RUNNING_NOTES_KEPT", "6"))
+STRONG_SCORE = 4.0
+WEAK_SCORE = 2.5
+
+
+def _empty():
+    return {"n": 0, "total": 0.0, "by_qtype": {}, "by_difficulty": {}, "strengths": [], "weaknesses": []}
+
+
+def _bump(buckets, key, score):
+    n, total = buckets.get(key, (0, 0.0))
+    buckets[key] = (n + 1, total + score)
+
+
+def apply(state, question_id, score, rationale):
+    """Fold one scored answer into ``state`` (mutated and returned)."""
+    q = catalog.current().get(question_id)
+    qtype = q.qtype if q else "unknown"
+    difficulty = str(q.difficulty) if q and q.difficulty is not None else "unknown"
+
+    state["n"] += 1
+    state["total"] += score
+    _bump(state["by_qtype"], qtype, score)
+    _bump(state["by_difficulty"], difficulty, score)
+
+    if score >= STRONG_SCORE or score <= WEAK_SCORE:
+        topic = (q.text if q else f"question {question_id}")[:80]
+        note = f"{qtype}, difficulty {difficulty}: {topic} (score {score})"
+        if rationale:
+            note += f" - {rationale[:160]}"
+        notes = state["strengths"] if score >= STRONG_SCORE else state["weaknesses"]
+        notes.append(note)
+        del notes[:-RUNNING_NOTES_KEPT]
+    return state
+
+
+def _save(cur, interview_id, state):
+    cur.execute(
+        """
+        INSERT INTO interview_state (interview_id,state,n,updated_at) VALUES (?,?,?,?)
+        ON CONFLICT(interview_id) DO UPDATE SET
+            state=excluded.state, n=excluded.n, updated_at=excluded.updated_at
+        """,
+        (interview_id, json.dumps(state), state["n"], int(time.time())),
+    )
+
+
+def update(cur, interview_id, question_id, score, rationale):
+    """Apply one scored response inside the caller's transaction."""
+    cur.execute("SELECT state FROM interview_state WHERE interview_id=?", (interview_id,))
+    row = cur.fetchone()
+    state = json.loads(row[0]) if row else _empty()
+    _save(cur, interview_id, apply(state, question_id, score, rationale))
+
+
+def load(interview_id):
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT state FROM interview_state WHERE interview_id=?", (interview_id,))
+        row = cur.fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def fold(rows):
+    """State for ``(question_id, score, llm_rationale)`` rows, oldest first."""
+    state = _empty()
+    for question_id, score, rationale in rows:
+        apply(state, question_id, score or 0.0, rationale)
+    return state
+
+
+def recompute(cur, interview_id):
+    """Recompute the state from the stored responses inside the caller's transaction."""
+    cur.execute(
+        """
+        SELECT question_id, score, llm_rationale FROM responses
+        WHERE interview_id=? AND COALESCE(status, 'scored') != 'pending'
+        ORDER BY created_at ASC
+        """,
+        (interview_id,),
+    )
+    state = fold(cur.fetchall())
+    _save(cur, interview_id, state)
+    return state
+
+
+def rebuild(interview_id):
+    """Recompute the state from the stored responses (older interviews)."""
+    with db.connection() as conn:
+        state = recompute(conn.cursor(), interview_id)
+        conn.commit()
+    return state
+
+
+def breakdown(state):
+    def avg(buckets):
+        return {k: {"answered": n, "average": round(total / n, 2)} for k, (n, total) in sorted(buckets.items())}
+
+    return {"by_qtype": avg(state["by_qtype"]), "by_difficulty": avg(state["by_difficulty"])}
+
+
+def summary_prompt(state):
+    """Constant-size prompt built from the running state."""
+    b = breakdown(state)
+    overall = round(state["total"] / state["n"], 2) if state["n"] else None
+    strengths = "\n".join(f"- {s}" for s in state["strengths"]) or "- none recorded"
+    weaknesses = "\n".join(f"- {w}" for w in state["weaknesses"]) or "- none recorded"
+    return f"""
+You are an interview evaluator for an Excel skills interview. Using the score
+breakdown and notes below (scores are 0-5), give:
+1. A short summary of performance
+2. Candidate strengths
+3. Candidate weaknesses
+
+Questions answered: {state["n"]}, overall average: {overall}
+Average by question type: {json.dumps(b["by_qtype"])}
+Average by difficulty: {json.dumps(b["by_difficulty"])}
+Notes on strong answers:
+{strengths}
+Notes on weak answers:
+{weaknesses}
+
+Return JSON only in this format:
+{{
+  "summary_text": "short summary",
+  "strengths": "list of strengths",
+  "weaknesses": "list of weaknesses"
+}}
+"""
+
+
+def fallback_summary(state):
+    """Deterministic summary used when no LLM is configured."""
+    if not state["n"]:
+        return {"summary_text": "N/A", "strengths": "N/A", "weaknesses": "N/A"}
+
+    by_qtype = breakdown(state)["by_qtype"]
+    ranked = sorted(by_qtype.items(), key=lambda kv: kv[1]["average"], reverse=True)
+    overall = round(state["total"] / state["n"], 2)
+    return {
+        "summary_text": f"Answered {state['n']} questions with an average score of {overall}/5.",
+        "strengths": ", ".join(f"{k} questions (avg {v['average']})" for k, v in ranked if v["average"] >= STRONG_SCORE) or "N/A",
+        "weaknesses": ", ".join(f"{k} questions (avg {v['average']})" for k, v in ranked if v["average"] <= WEAK_SCORE) or "N/A",
+    }
@@ -0,0 +1,176 @@
+import asyncio
+import os
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+import analytics
+import db
+import db_init
+import evaluator_store
+import running_summary
+
+# Deferred scoring: /responses stores the answer as "pending" plus a row in
+# score_jobs; workers here fill in the score and evaluator columns. Jobs live in SQLite,
+# so anything not finished before a restart is picked up again.
+SCORE_WORKERS = int(os.environ.get("SCORE_WORKERS", "4"))
+SCORE_MAX_ATTEMPTS = int(os.environ.get("SCORE_MAX_ATTEMPTS", "5"))
+SCORE_LOCK_SECONDS = int(os.environ.get("SCORE_LOCK_SECONDS", "120"))
+SCORE_POLL_INTERVAL = float(os.environ.get("SCORE_POLL_INTERVAL", "1.0"))
+
+_wakeup = None
+_tasks = []
+
+
+def enqueue(cur, response_id, now):
+    """Add a scoring job inside the caller's transaction."""
+    cur.execute(
+        "INSERT OR IGNORE INTO score_jobs (response_id,attempts,next_run_at,locked_until) VALUES (?,0,?,0)",
+        (response_id, now),
+    )
+
+
+def notify():
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def claim_job():
+    """Lock the next due job; returns the pending response row or None."""
+    now = int(time.time())
+    with db.connection() as conn:
+        cur = conn.cursor()
+        # Cheap read first so idle workers don't take the write lock on every poll
+        cur.execute(
+            "SELECT 1 FROM score_jobs WHERE next_run_at<=? AND locked_until<=? LIMIT 1",
+            (now, now),
+        )
+        if not cur.fetchone():
+            return None
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(
+            "SELECT response_id, attempts FROM score_jobs WHERE next_run_at<=? AND locked_until<=? ORDER BY next_run_at LIMIT 1",
+            (now, now),
+        )
+        job = cur.fetchone()
+        if not job:
+            conn.commit()
+            return None
+        cur.execute(
+            "UPDATE score_jobs SET attempts=attempts+1, locked_until=? WHERE response_id=?",
+            (now + SCORE_LOCK_SECONDS, job["response_id"]),
+        )
+        cur.execute("SELECT * FROM responses WHERE id=?", (job["response_id"],))
+        row = cur.fetchone()
+        if not row:
+            cur.execute("DELETE FROM score_jobs WHERE response_id=?", (job["response_id"],))
+        conn.commit()
+    if not row:
+        return None
+    result = dict(row)
+    result["attempts"] = job["attempts"] + 1
+    return result
+
+
+def complete_job(row, final_score, evaluator):
+    """Store the grade of a pending response; False when it was already scored."""
+    with db.connection() as conn:
+        cur = conn.cursor()
+        rule_score, llm_score, rationale, func_hits, source = evaluator_store.columns(evaluator)
+        cur.execute(
+            """
+            UPDATE responses SET score=?, rule_score=?, llm_score=?, llm_rationale=?, func_hits=?, source=?,
+                   evaluator_z=?, status='scored'
+            WHERE id=? AND status='pending'
+            """,
+            (final_score, rule_score, llm_score, rationale, func_hits, source, evaluator_store.pack(evaluator), row["id"]),
+        )
+        scored = cur.rowcount > 0
+        cur.execute("DELETE FROM score_jobs WHERE response_id=?", (row["id"],))
+        # A worker whose lease ran out can finish after another one already
+        # scored the row; counting it again would double the totals
+        if scored:
+            running_summary.update(cur, row["interview_id"], row["question_id"], final_score, rationale)
+            analytics.record(cur, [(row["question_id"], final_score, rule_score, llm_score)])
+        conn.commit()
+    return scored
+
+
+def retry_job(response_id, attempts, error):
+    delay = min(300, 2 ** attempts)
+    with db.connection() as conn:
+        conn.execute(
+            "UPDATE score_jobs SET next_run_at=?, locked_until=0, last_error=? WHERE response_id=?",
+            (int(time.time()) + delay, error, response_id),
+        )
+        conn.commit()
+
+
+async def run_once(grade):
+    """Score one job with ``grade(response_row) -> (score, evaluator)``; False when idle."""
+    row = await run_in_threadpool(claim_job)
+    if row is None:
+        return False
+
+    final_score, evaluator = await grade(row)
+    error = (evaluator.get("llm") or {}).get("error")
+    if error and error != "no_groq_key" and row["attempts"] < SCORE_MAX_ATTEMPTS:
+        await run_in_threadpool(retry_job, row["id"], row["attempts"], error)
+    else:
+        await run_in_threadpool(complete_job, row, final_score, evaluator)
+    return True
+
+
+async def _worker(grade):
+    while True:
+        try:
+            busy = await run_once(grade)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print("⚠️ scoring worker error:", e)
+            busy = False
+        if not busy:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=SCORE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+
+
+def start(grade, workers=SCORE_WORKERS):
+    global _wakeup
+    _wakeup = asyncio.Event()
+    for _ in range(workers):
+        _tasks.append(asyncio.create_task(_worker(grade)))
+
+
+async def stop():
+    for t in _tasks:
+        t.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+
+
+def pending_count(interview_id):
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT COUNT(1) FROM responses WHERE interview_id=? AND status='pending'",
+            (interview_id,),
+        )
+        n = cur.fetchone()[0]
+    return n
+
+
+# Standalone worker process: python scoring_worker.py
+if __name__ == "__main__":
+    import app
+
+    async def main():
+        start(app.grade_response)
+        await asyncio.gather(*_tasks)
+
+    db_init.init_db()
+    print(f"✅ Scoring worker running ({SCORE_WORKERS} tasks) on", db.DB)
+    asyncio.run(main())
@@ -0,0 +1,235 @@
+import difflib
+import hashlib
+import os
+import re
+import threading
+import time
+import zlib
+
+import db
+
+# ✅ Near-duplicate answer index (explain/task questions)
+# Every LLM-graded answer is stored per question as a hashed character n-gram
+# vector (3-5 grams, log-scaled counts, L2-normalized). A new answer whose
+# cosine similarity to its nearest graded neighbour reaches
+# SIMILARITY_THRESHOLD reuses that neighbour's score instead of calling the
+# LLM, provided the wording agrees too: character n-grams barely notice a
+# swapped pair of words or an added "not", so each row also keeps the answer's
+# hashed word sequence, and a candidate must match it with a word-level ratio of
+# SIMILARITY_WORD_RATIO, the same number of negations, a length ratio of at
+# least SIMILARITY_LENGTH_RATIO and no word deleted in one place and inserted in
+# another. Each question's vectors sit in a preallocated ring of at most
+# SIMILARITY_MAX_PER_QUESTION rows, tagged with a fingerprint of the model
+# answer, model and prompt version; a changed fingerprint empties it. The index
+# is saved to an .npz file next to the DB and loaded on startup.
+SIMILARITY_THRESHOLD = float(os.environ.get("SIMILARITY_THRESHOLD", "0.95"))  # 0 disables
+SIMILARITY_WORD_RATIO = float(os.environ.get("SIMILARITY_WORD_RATIO", "0.85"))
+SIMILARITY_LENGTH_RATIO = float(os.environ.get("SIMILARITY_LENGTH_RATIO", "0.8"))
+SIMILARITY_MIN_CHARS = int(os.environ.get("SIMILARITY_MIN_CHARS", "20"))
+SIMILARITY_MAX_PER_QUESTION = int(os.environ.get("SIMILARITY_MAX_PER_QUESTION", "1000"))
+SIMILARITY_INDEX_PATH = os.environ.get("SIMILARITY_INDEX_PATH") or os.path.splitext(db.DB)[0] + "_similarity.npz"
+SIMILARITY_SAVE_INTERVAL = float(os.environ.get("SIMILARITY_SAVE_INTERVAL", "30"))
+QTYPES = ("explain", "task")
+
+DIM = 1024
+NGRAMS = (3, 4, 5)
+MAX_CHARS = 2000
+MAX_WORDS = 256
+# Neighbours above the threshold checked word by word, best first
+CANDIDATES = 5
+
+# numpy is imported by the first call that needs it (the startup warm-up's
+# load()), not at import time, to keep cold starts short
+np = None
+_lock = threading.Lock()
+_index = {}  # question_id -> _QuestionIndex
+_dirty = False
+stats = {"hits": 0, "misses": 0, "added": 0, "resets": 0}
+
+
+def fingerprint(expected_answer, model, prompt_version):
+    raw = "\x1f".join([expected_answer or "", model, prompt_version])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _numpy():
+    global np
+    if np is None:
+        import numpy
+
+        np = numpy
+    return np
+
+
+def vectorize(text):
+    _numpy()
+    t = " " + re.sub(r"\s+", " ", (text or "").lower()).strip()[:MAX_CHARS] + " "
+    # crc32, not hash(): str hashes are salted per process and vectors are persisted
+    buckets = [
+        zlib.crc32(t[i:i + n].encode("utf-8")) % DIM
+        for n in NGRAMS
+        for i in range(len(t) - n + 1)
+    ]
+    v = np.log1p(np.bincount(buckets, minlength=DIM).astype(np.float32))
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+
+def _word_hash(w):
+    # Never 0, which pads the unused tail of a row
+    return zlib.crc32(w.encode("utf-8")) & 0x7FFFFFFF or 1
+
+
+NEGATIONS = frozenset(map(_word_hash, ("not", "no", "never", "none", "nothing", "nor", "neither", "cannot", "without")))
+
+
+def words(text):
+    _numpy()
+    t = re.sub(r"n't\b", " not", (text or "").lower()[:MAX_CHARS])
+    return np.array([_word_hash(w) for w in re.findall(r"[a-z0-9$']+", t)[:MAX_WORDS]], np.int32)
+
+
+def same_wording(a, b):
+    """Word-level check of two answers whose n-gram vectors are close."""
+    if min(len(a), len(b)) < SIMILARITY_LENGTH_RATIO * max(len(a), len(b)):
+        return False
+    a, b = a.tolist(), b.tolist()
+    if sum(w in NEGATIONS for w in a) != sum(w in NEGATIONS for w in b):
+        return False
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    if matcher.ratio() < SIMILARITY_WORD_RATIO:
+        return False
+    deleted, inserted = set(), set()
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            deleted.update(a[i1:i2])
+            inserted.update(b[j1:j2])
+    # A word taken out in one place and put back in another is a reordering, not a typo
+    return not deleted & inserted
+
+
+class _QuestionIndex:
+    __slots__ = ("fp", "vecs", "words", "scores", "n", "next")
+
+    def __init__(self, fp, vecs=None, words=None, scores=None):
+        self.fp = fp
+        self.vecs = vecs if vecs is not None else np.zeros((16, DIM), np.float32)
+        self.words = words if words is not None else np.zeros((len(self.vecs), MAX_WORDS), np.int32)
+        self.scores = scores if scores is not None else np.zeros(len(self.vecs), np.float32)
+        self.n = 0 if vecs is None else len(vecs)
+        self.next = self.n % SIMILARITY_MAX_PER_QUESTION
+
+    def add(self, vec, seq, score):
+        if self.n < SIMILARITY_MAX_PER_QUESTION and self.n == len(self.vecs):
+            cap = min(SIMILARITY_MAX_PER_QUESTION, 2 * len(self.vecs))
+            self.vecs = np.resize(self.vecs, (cap, DIM))
+            self.words = np.resize(self.words, (cap, MAX_WORDS))
+            self.scores = np.resize(self.scores, cap)
+        # Once full, the oldest row is overwritten
+        self.vecs[self.next] = vec
+        self.words[self.next] = 0
+        self.words[self.next, :len(seq)] = seq
+        self.scores[self.next] = score
+        self.next = (self.next + 1) % SIMILARITY_MAX_PER_QUESTION
+        self.n = min(self.n + 1, SIMILARITY_MAX_PER_QUESTION)
+
+    def oldest_first(self):
+        """Copies of the filled rows, oldest first (so a reload keeps ring order)."""
+        order = np.r_[self.next:self.n, 0:self.next] if self.n == SIMILARITY_MAX_PER_QUESTION else slice(0, self.n)
+        return self.vecs[order].copy(), self.words[order].copy(), self.scores[order].copy()
+
+    def nearest(self, vec, seq, threshold):
+        """``(similarity, score)`` of the closest row at or above ``threshold`` that also passes same_wording."""
+        if not self.n:
+            return None
+        sims = self.vecs[:self.n] @ vec
+        for i in np.argsort(sims)[::-1][:CANDIDATES]:
+            if sims[i] < threshold:
+                break
+            row = self.words[i]
+            if same_wording(row[:np.count_nonzero(row)], seq):
+                return float(sims[i]), float(self.scores[i])
+        return None
+
+
+def enabled(qtype, text):
+    return SIMILARITY_THRESHOLD > 0 and qtype in QTYPES and len((text or "").strip()) >= SIMILARITY_MIN_CHARS
+
+
+def lookup(question_id, fp, text):
+    """``(similarity, score)`` of the nearest graded answer above the threshold, else None."""
+    vec, seq = vectorize(text), words(text)
+    with _lock:
+        idx = _index.get(question_id)
+        found = idx.nearest(vec, seq, SIMILARITY_THRESHOLD) if idx is not None and idx.fp == fp else None
+    if found is None:
+        stats["misses"] += 1
+        return None
+    stats["hits"] += 1
+    return found
+
+
+def add(question_id, fp, text, score):
+    global _dirty
+    vec, seq = vectorize(text), words(text)
+    with _lock:
+        idx = _index.get(question_id)
+        if idx is None or idx.fp != fp:
+            if idx is not None:
+                stats["resets"] += 1
+            idx = _index[question_id] = _QuestionIndex(fp)
+        idx.add(vec, seq, score)
+        _dirty = True
+    stats["added"] += 1
+
+
+def load(path=SIMILARITY_INDEX_PATH):
+    _numpy()
+    if not os.path.exists(path):
+        return 0
+    with np.load(path) as data:
+        qids, fps = data["qids"], data["fps"]
+        # Questions saved before word sequences were kept start over
+        loaded = {
+            int(qid): _QuestionIndex(str(fp), data[f"v{qid}"], data[f"w{qid}"], data[f"s{qid}"])
+            for qid, fp in zip(qids, fps)
+            if f"w{qid}" in data.files
+        }
+    with _lock:
+        _index.update(loaded)
+    return sum(idx.n for idx in loaded.values())
+
+
+def save(path=SIMILARITY_INDEX_PATH):
+    """Write the index if it changed since the last save (atomic replace)."""
+    global _dirty
+    with _lock:
+        if not _dirty:
+            return False
+        items = [(qid, idx.fp) + idx.oldest_first() for qid, idx in _index.items()]
+        _dirty = False
+
+    arrays = {"qids": np.array([item[0] for item in items], np.int64), "fps": np.array([item[1] for item in items])}
+    for qid, _, vecs, seqs, scores in items:
+        arrays[f"v{qid}"] = vecs
+        arrays[f"w{qid}"] = seqs
+        arrays[f"s{qid}"] = scores
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+    return True
+
+
+def snapshot():
+    with _lock:
+        entries = sum(idx.n for idx in _index.values())
+    return dict(stats, questions=len(_index), entries=entries)
+
+
+# python similarity.py  -> index size per question
+if __name__ == "__main__":
+    started = time.perf_counter()
+    print("loaded", load(), "answers in", round(time.perf_counter() - started, 3), "s from", SIMILARITY_INDEX_PATH)
+    for qid, idx in sorted(_index.items()):
+        print(f"question {qid}: {idx.n} answers (fingerprint {idx.fp})")
@@ -0,0 +1,520 @@
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import random
+import time
+import zlib
+
+from fastapi.concurrency import run_in_threadpool
+
+import analytics
+import catalog
+import db
+import evaluator_store
+import question_order
+import reports
+import running_summary
+import scoring_worker
+import write_queue
+
+# ✅ Storage backends
+# The request path reads and writes candidates, interviews, questions,
+# responses and reports through backend(), which returns one of two
+# implementations of the same async methods:
+#   STORAGE_BACKEND=sqlite (default) - the pooled sqlite3 file with
+#       group-committed writes (db.py, write_queue.py); one node.
+#   STORAGE_BACKEND=databases - SQLAlchemy Core through `databases` against
+#       STORAGE_URL (default: aiosqlite on the same file; any server URL such
+#       as postgresql+asyncpg://... lets several workers and hosts share one
+#       database). Tables are created and questions seeded on first start;
+#       question edits are picked up on restart. SQLite and Postgres use
+#       INSERT/UPDATE ... RETURNING; other dialects (e.g. MySQL) use the
+#       driver's lastrowid and SELECT ... FOR UPDATE instead.
+# The SQLite-only side tables (deferred scoring queue, interview_state, verdict
+# cache tier, regrade jobs) stay on the local file; with the databases backend
+# SCORING_MODE must be "inline" and reports fold the responses instead of
+# reading interview_state.
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "sqlite")
+# Dialects with INSERT ... RETURNING and UPDATE ... RETURNING
+RETURNING_DIALECTS = ("sqlite", "postgresql")
+STORAGE_URL = os.environ.get("STORAGE_URL") or f"sqlite+aiosqlite:///{db.DB}"
+
+_backend = None
+
+
+# ✅ SQLite (pooled sqlite3 + write queue)
+def write_interview(cur, interview_id, name, email, now):
+    cur.execute(
+        "INSERT INTO candidates (name,email,started_at) VALUES (?,?,?)",
+        (name, email, now),
+    )
+    candidate_id = cur.lastrowid
+
+    cur.execute(
+        "INSERT INTO interviews (id,candidate_id,status,created_at,current_question_idx) VALUES (?,?,?,?,?)",
+        (interview_id, candidate_id, "in_progress", now, 0),
+    )
+
+
+def write_responses(cur, interview_id, rows, now, status="scored"):
+    """Insert ``(response_id, question_id, response_text, score, evaluator)`` rows with the caller's cursor."""
+    typed = [evaluator_store.columns(evaluator) for *_, evaluator in rows]
+    cur.executemany(
+        """
+        INSERT INTO responses (id,interview_id,question_id,response_text,score,
+                               rule_score,llm_score,llm_rationale,func_hits,source,evaluator_z,created_at,status)
+        VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
+        """,
+        [
+            (response_id, interview_id, question_id, response_text, final_score, *cols, evaluator_store.pack(evaluator), now, status)
+            for (response_id, question_id, response_text, final_score, evaluator), cols in zip(rows, typed)
+        ],
+    )
+    for (response_id, question_id, _, final_score, _), (rule_score, llm_score, rationale, *_) in zip(rows, typed):
+        if status == "pending":
+            scoring_worker.enqueue(cur, response_id, now)
+        else:
+            running_summary.update(cur, interview_id, question_id, final_score, rationale)
+    if status != "pending":
+        analytics.record(cur, [(row[1], row[3], cols[0], cols[1]) for row, cols in zip(rows, typed)])
+
+
+def advance_interview(cur, interview_id, cat):
+    """Serve the interview's next question: ``(position, question)``, or None if no such interview."""
+    cur.execute("SELECT current_question_idx, question_state FROM interviews WHERE id=?", (interview_id,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    position = row["current_question_idx"] or 0
+    state = json.loads(row["question_state"]) if row["question_state"] else question_order.new_state(interview_id)
+
+    last_score = None
+    if question_order.needs_last_score():
+        cur.execute(
+            """
+            SELECT score FROM responses
+            WHERE interview_id=? AND COALESCE(status, 'scored') != 'pending'
+            ORDER BY created_at DESC, rowid DESC LIMIT 1
+            """,
+            (interview_id,),
+        )
+        r = cur.fetchone()
+        last_score = r["score"] if r else None
+
+    question, state = question_order.advance(cat, state, last_score)
+    cur.execute(
+        "UPDATE interviews SET current_question_idx=?, question_state=? WHERE id=?",
+        (position + (question is not None), json.dumps(state), interview_id),
+    )
+    return position, question
+
+
+def load_response(response_id):
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT r.*, a.evaluator AS archived FROM responses r
+            LEFT JOIN response_archive a ON a.response_id = r.id
+            WHERE r.id=?
+            """,
+            (response_id,),
+        )
+        r = cur.fetchone()
+    return dict(r) if r else None
+
+
+def load_report_rows(interview_id):
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT q.id as question_id,
+                   q.text as question,
+                   q.expected_answer as correct_answer,
+                   r.response_text as your_answer,
+                   r.score,
+                   COALESCE(r.status, 'scored') as status
+            FROM responses r
+            LEFT JOIN questions q ON r.question_id = q.id
+            WHERE r.interview_id = ?
+            ORDER BY r.created_at ASC
+            """,
+            (interview_id,),
+        )
+        rows = cur.fetchall()
+    return [dict(r) for r in rows]
+
+
+def load_summary_state(interview_id, scored):
+    state = running_summary.load(interview_id)
+    if state is None or state["n"] != scored:
+        state = running_summary.rebuild(interview_id)
+    return state
+
+
+class SQLiteStorage:
+    name = "sqlite"
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def create_interview(self, interview_id, name, email, now):
+        await write_queue.write(write_interview, interview_id, name, email, now)
+
+    async def insert_responses(self, interview_id, rows, now, status="scored"):
+        await write_queue.write(write_responses, interview_id, rows, now, status)
+
+    async def advance_cursor(self, interview_id, cat):
+        # Read-modify-write in the single writer's transaction, so it is atomic
+        return await write_queue.write(advance_interview, interview_id, cat, wait=True)
+
+    async def get_response(self, response_id):
+        return await run_in_threadpool(load_response, response_id)
+
+    async def report_rows(self, interview_id):
+        return await run_in_threadpool(load_report_rows, interview_id)
+
+    async def summary_state(self, interview_id, scored):
+        return await run_in_threadpool(load_summary_state, interview_id, scored)
+
+    async def report_version(self, interview_id):
+        return await run_in_threadpool(reports.report_version, interview_id)
+
+    async def load_report(self, interview_id, version):
+        return await run_in_threadpool(reports.load_cached, interview_id, version)
+
+    async def store_report(self, interview_id, version, report):
+        await run_in_threadpool(reports.store, interview_id, version, report)
+
+    async def load_pdf(self, interview_id, version):
+        return await run_in_threadpool(reports.load_pdf, interview_id, version)
+
+    async def store_pdf(self, interview_id, version, pdf):
+        await run_in_threadpool(reports.store_pdf, interview_id, version, pdf)
+
+
+# ✅ SQLAlchemy Core schema (the same tables db_init.py creates in SQLite)
+# SQLAlchemy is imported only when the databases backend is used, keeping the
+# default cold start lean.
+@functools.lru_cache(maxsize=None)
+def schema():
+    import sqlalchemy as sa
+
+    md = sa.MetaData()
+    tables = {
+        "candidates": sa.Table(
+            "candidates", md,
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("name", sa.Text),
+            sa.Column("email", sa.Text),
+            sa.Column("started_at", sa.BigInteger),
+            sa.Column("finished_at", sa.BigInteger),
+        ),
+        "interviews": sa.Table(
+            "interviews", md,
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("candidate_id", sa.Integer, sa.ForeignKey("candidates.id")),
+            sa.Column("status", sa.Text),
+            sa.Column("current_question_idx", sa.Integer),
+            sa.Column("created_at", sa.BigInteger),
+            sa.Column("question_state", sa.Text),
+        ),
+        "questions": sa.Table(
+            "questions", md,
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("text", sa.Text),
+            sa.Column("qtype", sa.Text),
+            sa.Column("difficulty", sa.Integer),
+            sa.Column("expected_answer", sa.Text),
+            sa.Column("rubric", sa.Text),
+            sa.Index("idx_questions_difficulty", "difficulty", "id"),
+        ),
+        "responses": sa.Table(
+            "responses", md,
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("interview_id", sa.String(36), sa.ForeignKey("interviews.id")),
+            sa.Column("question_id", sa.Integer, sa.ForeignKey("questions.id")),
+            sa.Column("response_text", sa.Text),
+            sa.Column("score", sa.Float),
+            sa.Column("rule_score", sa.Float),
+            sa.Column("llm_score", sa.Float),
+            sa.Column("llm_rationale", sa.Text),
+            sa.Column("func_hits", sa.Integer),
+            sa.Column("source", sa.Text),
+            # Server databases compress large text themselves (e.g. Postgres TOAST)
+            sa.Column("evaluator_details", sa.Text),
+            sa.Column("created_at", sa.BigInteger),
+            sa.Column("status", sa.Text, server_default="scored"),
+            sa.Index("idx_responses_interview", "interview_id", "created_at"),
+        ),
+        "reports": sa.Table(
+            "reports", md,
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("interview_id", sa.String(36)),
+            sa.Column("summary_text", sa.Text),
+            sa.Column("strengths", sa.Text),
+            sa.Column("weaknesses", sa.Text),
+            sa.Column("overall_score", sa.Float),
+            sa.Column("version", sa.Text),
+            sa.Column("payload", sa.Text),
+            sa.Column("created_at", sa.BigInteger),
+            sa.Column("pdf", sa.LargeBinary),
+            sa.Column("pdf_version", sa.Text),
+            sa.Index("idx_reports_interview", "interview_id", unique=True),
+        ),
+    }
+    return md, tables
+
+
+# ✅ SQLAlchemy Core on `databases` (aiosqlite, asyncpg, aiomysql, ...)
+class DatabaseStorage:
+    name = "databases"
+
+    def __init__(self, url=STORAGE_URL):
+        import databases
+        import sqlalchemy as sa
+
+        self.sa = sa
+        self.db = databases.Database(url)
+        self.returning = self.db.url.dialect in RETURNING_DIALECTS
+        self.md, self.t = schema()
+        # Striped per-interview locks: CAS retries are then only across processes
+        self.cursor_locks = [asyncio.Lock() for _ in range(64)]
+
+    async def start(self):
+        from sqlalchemy.schema import CreateIndex, CreateTable
+
+        sa = self.sa
+        await self.db.connect()
+        if self.db.url.dialect == "sqlite":
+            # Persistent; lets readers run alongside the (single) writer
+            await self.db.execute("PRAGMA journal_mode=WAL")
+        for table in self.md.sorted_tables:
+            await self.db.execute(CreateTable(table, if_not_exists=True))
+            for index in table.indexes:
+                await self.db.execute(CreateIndex(index, if_not_exists=True))
+        # CREATE TABLE IF NOT EXISTS leaves tables from before these columns alone
+        responses = self.t["responses"]
+        for name, ddl in (
+            ("rule_score", "REAL"), ("llm_score", "REAL"), ("llm_rationale", "TEXT"), ("func_hits", "INTEGER"), ("source", "TEXT"),
+        ):
+            try:
+                await self.db.fetch_val(sa.select(responses.c[name]).limit(1))
+            except Exception:
+                await self.db.execute(f"ALTER TABLE responses ADD COLUMN {name} {ddl}")
+
+        questions = self.t["questions"]
+        if not await self.db.fetch_val(sa.select(sa.func.count()).select_from(questions)):
+            import db_init
+
+            await self.db.execute_many(
+                questions.insert(),
+                [dict(q, rubric=q.get("rubric", "")) for q in db_init.SEED_QUESTIONS],
+            )
+        await self.refresh_questions()
+
+    async def stop(self):
+        await self.db.disconnect()
+
+    async def refresh_questions(self):
+        rows = await self.db.fetch_all(self.sa.select(self.t["questions"]))
+        return catalog.install([dict(r._mapping) for r in rows])
+
+    async def create_interview(self, interview_id, name, email, now):
+        candidates, interviews = self.t["candidates"], self.t["interviews"]
+        async with self.db.transaction():
+            insert = candidates.insert().values(name=name, email=email, started_at=now)
+            if self.returning:
+                candidate_id = await self.db.fetch_val(insert.returning(candidates.c.id))
+            else:
+                # execute() returns the driver's lastrowid
+                candidate_id = await self.db.execute(insert)
+            await self.db.execute(
+                interviews.insert().values(
+                    id=interview_id, candidate_id=candidate_id, status="in_progress",
+                    created_at=now, current_question_idx=0,
+                )
+            )
+
+    async def insert_responses(self, interview_id, rows, now, status="scored"):
+        if status == "pending":
+            raise RuntimeError("deferred scoring needs STORAGE_BACKEND=sqlite")
+        await self.db.execute_many(
+            self.t["responses"].insert(),
+            [
+                dict(
+                    zip(evaluator_store.COLUMNS, evaluator_store.columns(evaluator)),
+                    id=response_id, interview_id=interview_id, question_id=question_id,
+                    response_text=response_text, score=final_score,
+                    evaluator_details=json.dumps(evaluator), created_at=now, status=status,
+                )
+                for response_id, question_id, response_text, final_score, evaluator in rows
+            ],
+        )
+
+    async def advance_cursor(self, interview_id, cat, attempts=8):
+        lock = self.cursor_locks[zlib.crc32(interview_id.encode("utf-8")) % len(self.cursor_locks)]
+        async with lock:
+            for attempt in range(attempts):
+                if self.returning:
+                    served = await self._try_advance(interview_id, cat)
+                else:
+                    # No UPDATE ... RETURNING to tell whether the CAS applied: hold the
+                    # row lock across the read-modify-write instead
+                    async with self.db.transaction():
+                        served = await self._try_advance(interview_id, cat)
+                if served is not False:
+                    return served
+                await asyncio.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+        raise RuntimeError("interview cursor kept changing; try again")
+
+    async def _try_advance(self, interview_id, cat):
+        """One optimistic attempt: the UPDATE only applies if no other worker moved the cursor first."""
+        sa, t, r = self.sa, self.t["interviews"], self.t["responses"]
+        query = sa.select(t.c.current_question_idx, t.c.question_state).where(t.c.id == interview_id)
+        row = await self.db.fetch_one(query if self.returning else query.with_for_update())
+        if row is None:
+            return None
+        position = row["current_question_idx"] or 0
+        state = json.loads(row["question_state"]) if row["question_state"] else question_order.new_state(interview_id)
+
+        last_score = None
+        if question_order.needs_last_score():
+            last_score = await self.db.fetch_val(
+                sa.select(r.c.score)
+                .where(r.c.interview_id == interview_id, sa.func.coalesce(r.c.status, "scored") != "pending")
+                .order_by(r.c.created_at.desc())
+                .limit(1)
+            )
+
+        question, state = question_order.advance(cat, state, last_score)
+        update = (
+            t.update()
+            .where(t.c.id == interview_id, sa.func.coalesce(t.c.current_question_idx, 0) == position)
+            .values(current_question_idx=position + (question is not None), question_state=json.dumps(state))
+        )
+        if not self.returning:
+            # The row is locked (SELECT ... FOR UPDATE), so the UPDATE applies
+            await self.db.execute(update)
+            return position, question
+        moved = await self.db.fetch_val(update.returning(t.c.id))
+        # False: another worker moved the cursor first
+        return (position, question) if moved is not None else False
+
+    async def get_response(self, response_id):
+        responses = self.t["responses"]
+        r = await self.db.fetch_one(self.sa.select(responses).where(responses.c.id == response_id))
+        return dict(r._mapping) if r else None
+
+    async def report_rows(self, interview_id):
+        sa, r, q = self.sa, self.t["responses"], self.t["questions"]
+        rows = await self.db.fetch_all(
+            sa.select(
+                q.c.id.label("question_id"),
+                q.c.text.label("question"),
+                q.c.expected_answer.label("correct_answer"),
+                r.c.response_text.label("your_answer"),
+                r.c.score,
+                sa.func.coalesce(r.c.status, "scored").label("status"),
+            )
+            .select_from(r.outerjoin(q, r.c.question_id == q.c.id))
+            .where(r.c.interview_id == interview_id)
+            .order_by(r.c.created_at)
+        )
+        return [dict(row._mapping) for row in rows]
+
+    async def summary_state(self, interview_id, scored):
+        # No interview_state table here: fold this interview's scored answers
+        sa, r = self.sa, self.t["responses"]
+        rows = await self.db.fetch_all(
+            sa.select(r.c.question_id, r.c.score, r.c.llm_rationale)
+            .where(r.c.interview_id == interview_id, sa.func.coalesce(r.c.status, "scored") != "pending")
+            .order_by(r.c.created_at)
+        )
+        return running_summary.fold(tuple(row._mapping.values()) for row in rows)
+
+    async def report_version(self, interview_id):
+        sa, r = self.sa, self.t["responses"]
+        row = await self.db.fetch_one(
+            sa.select(
+                sa.func.count().label("n"),
+                sa.func.max(r.c.created_at).label("last"),
+                sa.func.sum(r.c.score).label("total"),
+                sa.func.sum(sa.case((r.c.status == "pending", 1), else_=0)).label("pending"),
+            ).where(r.c.interview_id == interview_id)
+        )
+        if not row["n"]:
+            return None
+        raw = f"{interview_id}:{row['n']}:{row['last']}:{row['total'] or 0.0}:{row['pending'] or 0}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+    async def load_report(self, interview_id, version):
+        t = self.t["reports"]
+        payload = await self.db.fetch_val(
+            self.sa.select(t.c.payload).where(t.c.interview_id == interview_id, t.c.version == version)
+        )
+        return json.loads(payload) if payload else None
+
+    async def store_report(self, interview_id, version, report):
+        values = {
+            "interview_id": interview_id,
+            **reports.summary_columns(report),
+            "version": version,
+            "payload": json.dumps(report),
+            "created_at": int(time.time()),
+            "pdf": None,
+            "pdf_version": None,
+        }
+        await self._upsert(self.t["reports"], values, "interview_id")
+
+    async def _upsert(self, table, values, key):
+        dialect = self.db.url.dialect
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(table).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c[key]],
+                set_={k: stmt.excluded[k] for k in values if k != key},
+            )
+            await self.db.execute(stmt)
+            return
+        # Portable fallback for other dialects
+        async with self.db.transaction():
+            await self.db.execute(table.delete().where(table.c[key] == values[key]))
+            await self.db.execute(table.insert().values(**values))
+
+    async def load_pdf(self, interview_id, version):
+        t = self.t["reports"]
+        pdf = await self.db.fetch_val(
+            self.sa.select(t.c.pdf).where(t.c.interview_id == interview_id, t.c.pdf_version == version)
+        )
+        return bytes(pdf) if pdf is not None else None
+
+    async def store_pdf(self, interview_id, version, pdf):
+        t = self.t["reports"]
+        await self.db.execute(
+            t.update()
+            .where(t.c.interview_id == interview_id, t.c.version == version)
+            .values(pdf=pdf, pdf_version=version)
+        )
+
+
+def backend():
+    global _backend
+    if _backend is None:
+        if STORAGE_BACKEND == "databases":
+            _backend = DatabaseStorage()
+        elif STORAGE_BACKEND == "sqlite":
+            _backend = SQLiteStorage()
+        else:
+            raise ValueError(f"unknown STORAGE_BACKEND {STORAGE_BACKEND!r}")
+    return _backend
@@ -1,8 +1,7 @@
 import streamlit as st
 import requests
-import io
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+import json
+from requests.adapters import HTTPAdapter
 
 st.set_page_config(page_title="Excel Mock Interviewer PoC", layout="centered")
 
@@ -11,55 +10,62 @@ API = "https://excel-mock-interviewer-4.onrender.com"
 
 st.title("📝 Excel Mock Interviewer — PoC")
 
-# ✅ Function to generate PDF using ReportLab
-def generate_pdf(report_data, interview_id):
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-
-    # Title
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(50, height - 50, "Excel Mock Interview Report")
-
-    c.setFont("Helvetica", 11)
-    c.drawString(50, height - 80, f"Interview ID: {interview_id}")
-    c.drawString(50, height - 100, f"Overall Score: {report_data.get('overall', 'N/A')}")
-
-    y = height - 130
-    c.setFont("Helvetica", 10)
-    c.drawString(50, y, f"Summary: {report_data.get('summary_text', 'N/A')}")
-    y -= 20
-    c.drawString(50, y, f"Strengths: {report_data.get('strengths', 'N/A')}")
-    y -= 20
-    c.drawString(50, y, f"Weaknesses: {report_data.get('weaknesses', 'N/A')}")
-    y -= 40
-
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, y, "Detailed Question-wise Report:")
-    y -= 20
-
-    qa_data = report_data.get("questions", [])
-    c.setFont("Helvetica", 9)
-    for idx, qa in enumerate(qa_data, 1):
-        text_lines = [
-            f"Q{idx}. {qa.get('question', 'N/A')}",
-            f"Your Answer: {qa.get('your_answer', 'N/A')}",
-            f"Correct Answer: {qa.get('correct_answer', 'N/A')}",
-            f"Score: {qa.get('score', 'N/A')}"
-        ]
-        for line in text_lines:
-            c.drawString(60, y, line)
-            y -= 14
-            if y < 80:  # New page if space is low
-                c.showPage()
-                c.setFont("Helvetica", 9)
-                y = height - 80
-        y -= 10
-
-    c.save()
-    pdf_bytes = buffer.getvalue()
-    buffer.close()
-    return pdf_bytes
+
+# ✅ One keep-alive HTTP session for the whole app (reruns reuse the TLS connection)
+@st.cache_resource
+def http():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# ✅ The backend owns the question order; each call advances the interview's cursor,
+# so the served question is kept in session state across reruns
+def next_question(interview_id):
+    r = http().get(API + f'/interviews/{interview_id}/next', timeout=60)
+    r.raise_for_status()
+    return r.json()
+
+
+# ✅ Final report PDF, rendered and cached by the backend (re-downloaded only when it changes)
+def fetch_pdf(interview_id):
+    cached = st.session_state.get("pdf_cache")
+    headers = {}
+    if cached and cached["interview_id"] == interview_id:
+        headers["If-None-Match"] = cached["etag"]
+
+    r = http().get(API + f'/final_report/{interview_id}.pdf', headers=headers, timeout=120)
+    if r.status_code == 304:
+        return cached["data"]
+    if not r.ok:
+        return None
+
+    # Only stored PDFs carry an ETag; drop an older copy when a fallback comes back
+    st.session_state.pop("pdf_cache", None)
+    if r.headers.get("ETag"):
+        st.session_state["pdf_cache"] = {
+            "interview_id": interview_id,
+            "etag": r.headers["ETag"],
+            "data": r.content,
+        }
+    return r.content
+
+
+# ✅ Read the final report as Server-Sent Events: yields (event, data) pairs
+def stream_report(interview_id):
+    with http().get(
+        API + f'/final_report/{interview_id}/stream', stream=True, timeout=60
+    ) as r:
+        r.raise_for_status()
+        event = "message"
+        for line in r.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[5:])
+                event = "message"
 
 
 # --- Start Interview ---
@@ -80,11 +86,11 @@ if 'interview_id' not in st.session_state:
                     'college_name': college,
                     'course': course
                 }
-                r = requests.post(API + '/interviews', json=payload, timeout=30)
+                r = http().post(API + '/interviews', json=payload, timeout=30)
                 if r.ok:
                     st.session_state['interview_id'] = r.json().get('interview_id')
-                    st.session_state['q_idx'] = 0
                     st.session_state['current_answer'] = ""
+                    st.session_state['question'] = next_question(st.session_state['interview_id'])
                     st.rerun()
                 else:
                     st.error('❌ Could not start interview: ' + r.text)
@@ -95,15 +101,14 @@ if 'interview_id' not in st.session_state:
 # --- Interview Questions ---
 if 'interview_id' in st.session_state:
     st.markdown('**Interview ID:** ' + st.session_state['interview_id'])
-    idx = st.session_state.get('q_idx', 0)
-
-    try:
-        r = requests.get(API + f'/questions/{idx}', timeout=60)
-        r.raise_for_status()
-        q = r.json()
-    except Exception as e:
-        st.error(f"Could not fetch question: {e}")
-        st.stop()
+    if 'question' not in st.session_state:
+        try:
+            st.session_state['question'] = next_question(st.session_state['interview_id'])
+        except Exception as e:
+            st.error(f"Could not fetch question: {e}")
+            st.stop()
+    q = st.session_state['question']
+    idx = q.get('position', 0)
 
     st.subheader(f"Q{idx+1}. {q['text']}")
 
@@ -117,24 +122,46 @@ if 'interview_id' in st.session_state:
         height=120,
         key=f"answer_{idx}"
     )
+    # Checked against the question's columns / expected formula instead of the text
+    upload = None
+    if q.get('qtype') in ('formula', 'task'):
+        upload = st.file_uploader('Or upload a workbook', type=['xlsx', 'xlsm'], key=f"workbook_{idx}")
 
     # --- Submit Answer ---
-    if st.button('Submit Answer'):
-        if not ans.strip():
+    if q.get('done'):
+        st.info("🎉 You have answered every question. Finish the interview for your report.")
+    elif st.button('Submit Answer'):
+        if not ans.strip() and upload is None:
             st.warning("⚠️ Please provide an answer.")
         else:
             try:
-                payload = {
-                    'interview_id': st.session_state['interview_id'],
-                    'question_id': q['id'],
-                    'response_text': ans
-                }
-                r = requests.post(API + '/responses', data=payload, timeout=30)
+                if upload is not None:
+                    r = http().post(
+                        API + f"/interviews/{st.session_state['interview_id']}/workbook",
+                        data={'question_id': q['id'], 'advance': 'true'},
+                        files={'file': (upload.name, upload.getvalue())},
+                        timeout=60
+                    )
+                else:
+                    payload = {
+                        'interview_id': st.session_state['interview_id'],
+                        'question_id': q['id'],
+                        'response_text': ans,
+                        'advance': 'true'
+                    }
+                    r = http().post(API + '/responses', data=payload, timeout=30)
                 if r.ok:
                     res = r.json()
-                    st.success(f"✅ Score: {res.get('score')}")
-                    st.json(res.get('evaluator'))
-                    st.session_state['q_idx'] = idx + 1
+                    # Next question comes back with the submit; no extra round trip on rerun
+                    if res.get('next_question'):
+                        st.session_state['question'] = res['next_question']
+                    else:
+                        st.session_state.pop('question', None)
+                    if res.get('status') == 'pending':
+                        st.info("📝 Answer saved — grading in progress.")
+                    else:
+                        st.success(f"✅ Score: {res.get('score')}")
+                        st.json(res.get('evaluator'))
                     # ✅ Clear previous answer
                     st.session_state.current_answer = ""
                     st.rerun()
@@ -146,12 +173,8 @@ if 'interview_id' in st.session_state:
     # --- Download Q&A PDF anytime ---
     if st.button("📥 Download Q&A Report"):
         try:
-            report_resp = requests.get(
-                API + f'/final_report/{st.session_state["interview_id"]}', timeout=60
-            )
-            if report_resp.ok:
-                report_data = report_resp.json()
-                pdf_bytes = generate_pdf(report_data, st.session_state["interview_id"])
+            pdf_bytes = fetch_pdf(st.session_state["interview_id"])
+            if pdf_bytes is not None:
                 file_name = f'qa_report_{st.session_state["interview_id"]}.pdf'
                 st.download_button(
                     label="⬇️ Download Questions & Answers PDF",
@@ -167,12 +190,35 @@ if 'interview_id' in st.session_state:
     # --- Finish Interview (show feedback + generate/download PDF) ---
     if st.button("Finish Interview"):
         try:
-            report_resp = requests.get(
-                API + f'/final_report/{st.session_state["interview_id"]}', timeout=60
-            )
-            if report_resp.ok:
-                report_data = report_resp.json()
-                pdf_bytes = generate_pdf(report_data, st.session_state["interview_id"])
+            # Render the per-question table as soon as it arrives, then the summary as it streams
+            scores_box = st.empty()
+            summary_box = st.empty()
+            report_data, summary, live_text = None, {}, ""
+            for event, data in stream_report(st.session_state["interview_id"]):
+                if event == "questions":
+                    with scores_box.container():
+                        st.metric("Overall Score", data.get("overall", "N/A"))
+                        st.dataframe([
+                            {"Question": qa.get("question"), "Your Answer": qa.get("your_answer"), "Score": qa.get("score")}
+                            for qa in data.get("questions", [])
+                        ])
+                elif event == "token":
+                    live_text += data.get("text", "")
+                    if not summary:
+                        summary_box.caption("✍️ " + live_text)
+                elif event == "summary":
+                    summary.update(data)
+                    with summary_box.container():
+                        st.subheader("📊 Feedback Summary")
+                        st.write("**Summary:**", summary.get("summary_text", "…"))
+                        st.write("**Strengths:**", summary.get("strengths", "…"))
+                        st.write("**Weaknesses:**", summary.get("weaknesses", "…"))
+                elif event == "done":
+                    report_data = data
+
+            # The streamed report is materialized by now, so this reuses it
+            pdf_bytes = fetch_pdf(st.session_state["interview_id"]) if report_data is not None else None
+            if pdf_bytes is not None:
                 file_name = f'final_report_{st.session_state["interview_id"]}.pdf'
                 st.download_button(
                     label="⬇️ Download Final Report (PDF)",
@@ -180,11 +226,6 @@ if 'interview_id' in st.session_state:
                     file_name=file_name,
                     mime="application/pdf"
                 )
-                st.subheader("📊 Feedback Summary")
-                st.write("**Summary:**", report_data.get("summary_text", "N/A"))
-                st.write("**Strengths:**", report_data.get("strengths", "N/A"))
-                st.write("**Weaknesses:**", report_data.get("weaknesses", "N/A"))
-                st.metric("Overall Score", report_data.get("overall", "N/A"))
                 st.success("✅ Interview finished. Report generated successfully.")
                 st.balloons()
             else:
@@ -193,7 +234,7 @@ if 'interview_id' in st.session_state:
             st.error(f"Report fetch error: {e}")
 
         # ✅ Reset session after finishing
-        for key in ["interview_id", "q_idx", "current_answer"]:
+        for key in ["interview_id", "question", "current_answer", "pdf_cache"]:
             if key in st.session_state:
                 del st.session_state[key]
         st.rerun()
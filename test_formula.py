@@ -0,0 +1,54 @@
+import pytest
+
+import db_init
+import formula
+
+# (model answer, candidate answer, formula.equivalent result)
+# True: confidently the same formula; False: a different one; None: can't judge (the LLM decides)
+CASES = [
+    # spelling Excel treats the same
+    ("=SUM(A1:A10)", "=sum(a1:a10)", True),
+    ("=SUM(A1:A10)", "=SUM($A$1:$A$10)", True),
+    ("=A1+B1", "=B1+A1", True),
+    ("=A1-B1", "=B1-A1", False),
+    ("=SUM(A1:A10)", "=SUM(A1:A9)", False),
+    # SUMIF / SUMIFS / SUMPRODUCT forms
+    ('=SUMIFS(B:B, A:A, "India")', '=SUMIF(A:A, "India", B:B)', True),
+    ('=SUMIFS(B:B, A:A, "India")', '=SUMIF(A:A, "=India", B:B)', True),
+    ('=SUMIFS(B:B, A:A, "India")', '=SUMPRODUCT((A2:A100="India")*B2:B100)', True),
+    ('=SUMIFS(B:B, A:A, "India")', '=SUMIFS(B:B, A:A, "China")', False),
+    ('=SUMIFS(B:B, A:A, "India")', '=SUMIFS(A:A, B:B, "India")', False),
+    # whole columns in the model answer stand for bounded ranges, not the other way round
+    ("=INDEX(C:C, MATCH(123, A:A, 0))", "=INDEX(C2:C100, MATCH(123, A2:A100, 0))", True),
+    ("=INDEX(C:C, MATCH(123, A:A, 0))", "=INDEX(C2:C100, MATCH(123, A1:A50, 0))", False),
+    ("=COUNTA(UNIQUE(A2:A100))", "=COUNTA(UNIQUE(A:A))", False),
+    ("=LARGE(A1:A50, n)", "=LARGE(A:A, 3)", False),
+    # placeholders bind consistently, to something of the slot's kind
+    ("=LARGE(A1:A50, n)", "=LARGE(A1:A50, 3)", True),
+    ("=LARGE(A1:A50, n)", "=LARGE(A1:A50, B1)", True),
+    ("=LARGE(A1:A50, n)", '=LARGE(A1:A50, "x")', None),
+    ("=LARGE(A1:A50, n)", "=LARGE(A1:A50, B1:B50)", None),
+    ("=LARGE(A1:A50, n)", "=LARGE(A1:A50, A1)", None),
+    ("=LARGE(A1:A50, n)", "=SMALL(A1:A50, 3)", False),
+    ("=SUMPRODUCT(values, weights)/SUM(weights)", "=SUMPRODUCT(B2:B10, C2:C10)/SUM(C2:C10)", True),
+    ("=SUMPRODUCT(values, weights)/SUM(weights)", "=SUMPRODUCT(B2:B10, C2:C10)/SUM(B2:B10)", True),
+    ("=SUMPRODUCT(values, weights)/SUM(weights)", "=SUMPRODUCT(B2:B10, C2:C10)/SUM(D2:D10)", False),
+    ("=SUMPRODUCT(values, weights)/SUM(weights)", "=SUMPRODUCT(B2:B10, B2:B10)/SUM(B2:B10)", False),
+    ("=(End/Start)^(1/Periods)-1", "=(B5/B1)^(1/4)-1", True),
+    ("=(End/Start)^(1/Periods)-1", "=(B5/B1)^(1/B1)-1", False),
+    ("=(End/Start)^(1/Periods)-1", '=(B5/"x")^(1/4)-1', None),
+    # unparseable answers can't be judged
+    ("=SUM(A1:A10)", "=SUM(A1:A10", None),
+]
+
+
+@pytest.mark.parametrize("expected,answer,result", CASES)
+def test_equivalent(expected, answer, result):
+    assert formula.equivalent(formula.compile_expected(expected), answer) is result
+
+
+@pytest.mark.parametrize("expected", [q["expected_answer"] for q in db_init.SEED_QUESTIONS if q["qtype"] == "formula"])
+def test_seed_answers_match_themselves(expected):
+    compiled = formula.compile_expected(expected)
+    if compiled is not None:
+        assert formula.equivalent(compiled, expected.split(" entered")[0].strip("{}")) is True
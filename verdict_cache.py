@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+
+from fastapi.concurrency import run_in_threadpool
+
+import db
+
+# Two-tier cache of LLM verdicts: an in-memory LRU in front of the
+# llm_verdicts table. Keys cover question id, expected answer, normalized
+# candidate answer, model and prompt version, so any of those changing is a miss.
+VERDICT_CACHE_SIZE = int(os.environ.get("VERDICT_CACHE_SIZE", "5000"))
+VERDICT_CACHE_TTL = int(os.environ.get("VERDICT_CACHE_TTL", str(7 * 24 * 3600)))
+VERDICT_CACHE_DB_MAX = int(os.environ.get("VERDICT_CACHE_DB_MAX", "200000"))
+
+_lru = OrderedDict()  # key -> (question_id, expires_at, score, details)
+_inflight = {}  # key -> asyncio.Future
+_writes = 0
+stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+
+def normalize_answer(text):
+    return re.sub(r"\s+", " ", (text or "").strip()).lower()
+
+
+def make_key(question_id, expected_answer, answer, model, prompt_version):
+    raw = "\x1f".join(
+        [str(question_id), expected_answer or "", normalize_answer(answer), model, prompt_version]
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _memory_get(key):
+    entry = _lru.get(key)
+    if entry is None:
+        return None
+    if entry[1] < time.time():
+        del _lru[key]
+        stats["evictions"] += 1
+        return None
+    _lru.move_to_end(key)
+    return entry[2], entry[3]
+
+
+def _memory_put(key, question_id, score, details, expires_at):
+    _lru[key] = (question_id, expires_at, score, details)
+    _lru.move_to_end(key)
+    while len(_lru) > VERDICT_CACHE_SIZE:
+        _lru.popitem(last=False)
+        stats["evictions"] += 1
+
+
+def _db_get(key):
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT question_id, score, details, created_at FROM llm_verdicts WHERE key=? AND created_at>=?",
+            (key, int(time.time()) - VERDICT_CACHE_TTL),
+        )
+        row = cur.fetchone()
+    return dict(row) if row else None
+
+
+def _db_put(key, question_id, model, prompt_version, score, details):
+    global _writes
+    now = int(time.time())
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT OR REPLACE INTO llm_verdicts (key,question_id,model,prompt_version,score,details,created_at) VALUES (?,?,?,?,?,?,?)",
+            (key, question_id, model, prompt_version, score, json.dumps(details), now),
+        )
+        _writes += 1
+        if _writes % 500 == 0:
+            cur.execute("DELETE FROM llm_verdicts WHERE created_at<?", (now - VERDICT_CACHE_TTL,))
+            cur.execute(
+                "DELETE FROM llm_verdicts WHERE key IN (SELECT key FROM llm_verdicts ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (VERDICT_CACHE_DB_MAX,),
+            )
+        conn.commit()
+
+
+async def get_or_compute(question_id, expected_answer, answer, model, prompt_version, compute):
+    """Return ``(score, details)`` from cache, or await ``compute()`` once per key.
+
+    Only verdicts with a score are cached; errors are returned but not stored.
+    Concurrent callers with the same key share one in-flight computation.
+    """
+    key = make_key(question_id, expected_answer, answer, model, prompt_version)
+
+    hit = _memory_get(key)
+    if hit is not None:
+        stats["memory_hits"] += 1
+        return hit[0], dict(hit[1], cached="memory")
+
+    fut = _inflight.get(key)
+    if fut is not None:
+        stats["coalesced"] += 1
+        score, details = await asyncio.shield(fut)
+        return score, dict(details)
+
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        row = await run_in_threadpool(_db_get, key)
+        if row is not None:
+            stats["db_hits"] += 1
+            details = json.loads(row["details"])
+            _memory_put(key, question_id, row["score"], details, row["created_at"] + VERDICT_CACHE_TTL)
+            result = (row["score"], dict(details, cached="db"))
+        else:
+            stats["misses"] += 1
+            score, details = await compute()
+            if score is not None:
+                _memory_put(key, question_id, score, details, time.time() + VERDICT_CACHE_TTL)
+                await run_in_threadpool(_db_put, key, question_id, model, prompt_version, score, details)
+            result = (score, details)
+        fut.set_result(result)
+        return result
+    except BaseException as e:
+        fut.set_exception(e)
+        fut.exception()  # mark retrieved when nobody else is waiting
+        raise
+    finally:
+        del _inflight[key]
+
+
+def invalidate_question(question_id):
+    """Drop every cached verdict for one question (e.g. after editing its expected_answer)."""
+    for key in [k for k, v in _lru.items() if v[0] == question_id]:
+        del _lru[key]
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM llm_verdicts WHERE question_id=?", (question_id,))
+        n = cur.rowcount
+        conn.commit()
+    return n
+
+
+def snapshot():
+    return dict(stats, memory_entries=len(_lru), inflight=len(_inflight))
+
+
+# python verdict_cache.py invalidate <question_id>
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "invalidate":
+        print("🗑️ removed", invalidate_question(int(sys.argv[2])), "cached verdicts")
+    else:
+        print("usage: python verdict_cache.py invalidate <question_id>")
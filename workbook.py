@@ -0,0 +1,258 @@
+import asyncio
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import formula
+
+# ✅ Spreadsheet upload checks
+# The multipart body is parsed as it arrives (receive()): the file part goes
+# straight to a temp file, never held in memory or spooled twice, and the
+# upload is cut off with a 413 as soon as it passes WORKBOOK_MAX_BYTES, with or
+# without a Content-Length. The file is read with openpyxl in read_only mode,
+# row by row, in a small process pool so a large or hostile workbook can't
+# stall the event loop. Limits:
+#   WORKBOOK_MAX_BYTES    - upload size (413 above it)
+#   WORKBOOK_MAX_UNZIPPED - total uncompressed size of the .xlsx parts (zip bombs)
+#   WORKBOOK_MAX_ROWS     - rows across all sheets; WORKBOOK_MAX_COLS columns per row are read
+#   WORKBOOK_TIMEOUT      - seconds per check, enforced inside the worker
+#   WORKBOOK_QUEUE        - uploads allowed to wait for a worker (503 beyond it)
+WORKBOOK_WORKERS = int(os.environ.get("WORKBOOK_WORKERS", "2"))
+WORKBOOK_MAX_BYTES = int(os.environ.get("WORKBOOK_MAX_BYTES", str(10 * 1024 * 1024)))
+WORKBOOK_MAX_UNZIPPED = int(os.environ.get("WORKBOOK_MAX_UNZIPPED", str(200 * 1024 * 1024)))
+WORKBOOK_MAX_ROWS = int(os.environ.get("WORKBOOK_MAX_ROWS", "100000"))
+WORKBOOK_MAX_COLS = int(os.environ.get("WORKBOOK_MAX_COLS", "200"))
+WORKBOOK_TIMEOUT = float(os.environ.get("WORKBOOK_TIMEOUT", "20"))
+WORKBOOK_QUEUE = int(os.environ.get("WORKBOOK_QUEUE", "8"))
+
+# Distinct formulas returned for rule scoring, and compared against the expected one
+FORMULA_SAMPLE = 20
+FORMULAS_COMPARED = 5000
+# Total size of the non-file form fields
+FIELDS_MAX_BYTES = 64 * 1024
+
+_pool = None
+_slots = {}
+_waiting = 0
+
+
+class WorkbookError(ValueError):
+    """The upload can't be checked; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+    def __reduce__(self):
+        # Keeps the status when raised in a pool worker
+        return type(self), (str(self), self.status)
+
+
+async def receive(chunks, content_type, dst, file_field="file", limit=WORKBOOK_MAX_BYTES):
+    """Parse a multipart/form-data body from the async iterator ``chunks``.
+
+    The ``file_field`` part is written to file object ``dst`` (off the event
+    loop) as it arrives. Returns ``(fields, filename)``, fields as str.
+    """
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+
+    kind, params = parse_options_header(content_type or "")
+    if kind != b"multipart/form-data" or not params.get(b"boundary"):
+        raise WorkbookError("expected a multipart/form-data upload")
+
+    fields, values, pending = {}, {}, []
+    part = {"name": None, "filename": None, "header": b"", "value": b"", "headers": {}}
+    sizes = {"file": 0, "fields": 0, "files": 0}
+
+    def on_part_begin():
+        part.update(name=None, filename=None, headers={})
+        values.clear()
+
+    def on_header_field(data, start, end):
+        part["header"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["header"].lower()] = part["value"]
+        part["header"] = part["value"] = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        part["name"] = disposition.get(b"name", b"").decode("utf-8", "replace")
+        filename = disposition.get(b"filename")
+        part["filename"] = filename.decode("utf-8", "replace") if filename is not None else None
+        if part["name"] == file_field:
+            sizes["files"] += 1
+
+    def on_part_data(data, start, end):
+        if part["name"] == file_field and sizes["files"] == 1:
+            sizes["file"] += end - start
+            if sizes["file"] > limit:
+                raise WorkbookError(f"workbook larger than {limit} bytes", status=413)
+            pending.append(data[start:end])
+        elif part["filename"] is None:
+            sizes["fields"] += end - start
+            if sizes["fields"] > FIELDS_MAX_BYTES:
+                raise WorkbookError(f"form fields larger than {FIELDS_MAX_BYTES} bytes", status=413)
+            values[part["name"]] = values.get(part["name"], b"") + data[start:end]
+
+    def on_part_end():
+        if part["name"] == file_field and sizes["files"] == 1:
+            fields[file_field] = part["filename"] or ""
+        elif part["filename"] is None and part["name"]:
+            fields[part["name"]] = values.get(part["name"], b"").decode("utf-8", "replace")
+
+    parser = MultipartParser(
+        params[b"boundary"],
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+    try:
+        async for chunk in chunks:
+            parser.write(chunk)
+            if pending:
+                data = b"".join(pending)
+                pending.clear()
+                await asyncio.get_running_loop().run_in_executor(None, dst.write, data)
+        parser.finalize()
+    except MultipartParseError as e:
+        raise WorkbookError(f"malformed multipart upload: {e}")
+    if file_field not in fields:
+        raise WorkbookError(f"no {file_field!r} part in the upload", status=422)
+    return {k: v for k, v in fields.items() if k != file_field}, fields[file_field]
+
+
+def _normalized(text):
+    return "".join(text.lower().split())
+
+
+def check(path, expected="", expected_is_formula=False, required_columns=()):
+    """Scan a workbook: header columns found, formula cells, and a formula matching ``expected``.
+
+    Runs in a pool worker; raises WorkbookError when a limit is hit.
+    """
+    from openpyxl import load_workbook
+
+    deadline = time.monotonic() + WORKBOOK_TIMEOUT
+    try:
+        with zipfile.ZipFile(path) as z:
+            unzipped = sum(i.file_size for i in z.infolist())
+    except zipfile.BadZipFile:
+        raise WorkbookError("not an .xlsx/.xlsm workbook")
+    if unzipped > WORKBOOK_MAX_UNZIPPED:
+        raise WorkbookError(f"workbook expands to more than {WORKBOOK_MAX_UNZIPPED} bytes", status=413)
+
+    compiled = formula.compile_expected(expected) if expected_is_formula else None
+    target = _normalized(expected) if expected_is_formula else None
+    wanted = {c.strip().lower(): c for c in required_columns if c.strip()}
+    found, compared, sample = set(), set(), []
+    rows = formula_cells = 0
+    matched = None
+
+    try:
+        wb = load_workbook(path, read_only=True, data_only=False)
+    except Exception as e:
+        raise WorkbookError(f"unreadable workbook: {type(e).__name__}")
+    try:
+        sheets = wb.sheetnames
+        for ws in wb.worksheets:
+            header_seen = False
+            for row in ws.iter_rows(max_col=WORKBOOK_MAX_COLS, values_only=True):
+                rows += 1
+                if rows > WORKBOOK_MAX_ROWS:
+                    raise WorkbookError(f"workbook has more than {WORKBOOK_MAX_ROWS} rows", status=413)
+                if rows % 256 == 0 and time.monotonic() > deadline:
+                    raise WorkbookError(f"workbook check took longer than {WORKBOOK_TIMEOUT:g} s", status=422)
+                if not header_seen and any(v is not None for v in row):
+                    # First non-empty row of each sheet holds the column names
+                    header_seen = True
+                    found |= {str(v).strip().lower() for v in row if v is not None} & wanted.keys()
+                for v in row:
+                    # Array formulas come back as objects with the formula in .text
+                    text = getattr(v, "text", v)
+                    if not (isinstance(text, str) and text.startswith("=")):
+                        continue
+                    formula_cells += 1
+                    if len(sample) < FORMULA_SAMPLE and text not in sample:
+                        sample.append(text)
+                    if matched is None and compiled is not None and text not in compared and len(compared) < FORMULAS_COMPARED:
+                        compared.add(text)
+                        if _normalized(text) == target or formula.equivalent(compiled, text):
+                            matched = text
+    finally:
+        wb.close()
+
+    return {
+        "sheets": sheets,
+        "rows": rows,
+        "formula_cells": formula_cells,
+        "formulas": sample,
+        "matched_formula": matched,
+        "columns_found": sorted(wanted[c] for c in found),
+        "columns_missing": sorted(wanted[c] for c in wanted.keys() - found),
+    }
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=WORKBOOK_WORKERS)
+    return _pool
+
+
+def _slots_for_loop():
+    # One semaphore per event loop (asyncio primitives bind to the loop that first uses them)
+    loop = asyncio.get_running_loop()
+    slots = _slots.get(loop)
+    if slots is None:
+        slots = _slots[loop] = asyncio.Semaphore(WORKBOOK_WORKERS)
+    return slots
+
+
+async def check_async(path, expected="", expected_is_formula=False, required_columns=()):
+    global _waiting
+    if _waiting >= WORKBOOK_WORKERS + WORKBOOK_QUEUE:
+        raise WorkbookError("too many workbook checks in progress", status=503)
+    _waiting += 1
+    try:
+        async with _slots_for_loop():
+            future = asyncio.get_running_loop().run_in_executor(
+                _executor(), check, path, expected, expected_is_formula, tuple(required_columns)
+            )
+            try:
+                # The worker stops itself at WORKBOOK_TIMEOUT; this catches one stuck outside the row loop
+                return await asyncio.wait_for(future, WORKBOOK_TIMEOUT + 5)
+            except asyncio.TimeoutError:
+                shutdown(kill=True)
+                raise WorkbookError(f"workbook check took longer than {WORKBOOK_TIMEOUT:g} s", status=422)
+            except BrokenProcessPool:
+                # Another check's hung worker was killed along with this one
+                raise WorkbookError("workbook checker restarted, please retry", status=503)
+    finally:
+        _waiting -= 1
+
+
+def shutdown(kill=False):
+    """Stop the pool; ``kill=True`` also terminates workers still running a check."""
+    global _pool
+    if _pool is None:
+        return
+    pool, _pool = _pool, None
+    # concurrent.futures has no public way to stop a running task, so a hung
+    # worker would otherwise hold its process until it finishes on its own
+    processes = list((getattr(pool, "_processes", None) or {}).values()) if kill else []
+    pool.shutdown(wait=False, cancel_futures=True)
+    for p in processes:
+        p.terminate()
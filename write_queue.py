@@ -0,0 +1,180 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+import db
+import metrics
+
+# ✅ Group-commit write queue
+# Request handlers hand their INSERTs to one writer thread as ``fn(cur, *args)``
+# jobs. The writer drains whatever is queued (up to WRITE_BATCH_MAX, waiting at
+# most WRITE_BATCH_WINDOW_MS for stragglers), runs each job under its own
+# SAVEPOINT inside one transaction and commits once, so N answers cost one
+# fsync instead of N. A failing job is rolled back alone and its caller gets
+# the exception.
+#
+# WRITE_DURABILITY (also applied to the per-request path when WRITE_QUEUE=0):
+#   "full"   - synchronous=FULL; callers wait for the commit (survives power loss)
+#   "normal" - synchronous=NORMAL (WAL); callers wait for the commit (survives
+#              a process crash; the last commits may be lost on power loss)
+#   "async"  - callers return once the job is queued; errors are only logged
+WRITE_QUEUE = os.environ.get("WRITE_QUEUE", "1") == "1"
+WRITE_DURABILITY = os.environ.get("WRITE_DURABILITY", "normal")
+WRITE_BATCH_MAX = int(os.environ.get("WRITE_BATCH_MAX", "64"))
+WRITE_BATCH_WINDOW_MS = float(os.environ.get("WRITE_BATCH_WINDOW_MS", "1"))
+
+_jobs = queue.Queue()
+_writer = None
+_start_lock = threading.Lock()
+_STOP = object()
+stats = {"batches": 0, "writes": 0, "errors": 0}
+
+BATCH_SIZE = metrics.Histogram(
+    "write_batch_size", "Jobs committed per group commit.", buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+COMMIT_SECONDS = metrics.Histogram("write_commit_duration_seconds", "Time to run and commit one batch.")
+WAIT_SECONDS = metrics.Histogram("write_wait_duration_seconds", "Enqueue to commit, per job.")
+
+
+def _resolve(fut, result, error):
+    if fut.done():
+        return
+    if error is not None:
+        fut.set_exception(error)
+    else:
+        fut.set_result(result)
+
+
+def _settle(job, result, error):
+    _, _, loop, fut, queued_at = job
+    WAIT_SECONDS.observe(value=time.perf_counter() - queued_at)
+    if error is not None:
+        stats["errors"] += 1
+        if fut is None:
+            print("❌ queued write failed:", error)
+    if fut is not None:
+        loop.call_soon_threadsafe(_resolve, fut, result, error)
+
+
+def _collect(first):
+    batch = [first]
+    deadline = time.perf_counter() + WRITE_BATCH_WINDOW_MS / 1000
+    while len(batch) < WRITE_BATCH_MAX:
+        try:
+            job = _jobs.get_nowait()
+        except queue.Empty:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                job = _jobs.get(timeout=remaining)
+            except queue.Empty:
+                break
+        if job is _STOP:
+            _jobs.put(_STOP)
+            break
+        batch.append(job)
+    return batch
+
+
+def _synchronous(conn):
+    conn.execute(f"PRAGMA synchronous={'FULL' if WRITE_DURABILITY == 'full' else 'NORMAL'}")
+
+
+def _commit(batch):
+    started = time.perf_counter()
+    outcomes = []
+    try:
+        with db.connection() as conn:
+            _synchronous(conn)
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            for fn, args, _, _, _ in batch:
+                cur.execute("SAVEPOINT job")
+                try:
+                    outcomes.append((fn(cur, *args), None))
+                    cur.execute("RELEASE job")
+                except Exception as e:
+                    cur.execute("ROLLBACK TO job")
+                    cur.execute("RELEASE job")
+                    outcomes.append((None, e))
+            conn.commit()
+    except Exception as e:
+        # The transaction itself failed: nothing in this batch was written
+        outcomes = [(None, e)] * len(batch)
+
+    COMMIT_SECONDS.observe(value=time.perf_counter() - started)
+    BATCH_SIZE.observe(value=len(batch))
+    stats["batches"] += 1
+    stats["writes"] += len(batch)
+    for job, (result, error) in zip(batch, outcomes):
+        _settle(job, result, error)
+
+
+def _run():
+    while True:
+        job = _jobs.get()
+        if job is _STOP:
+            return
+        _commit(_collect(job))
+
+
+def start():
+    global _writer
+    with _start_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_run, name="db-writer", daemon=True)
+            _writer.start()
+
+
+def stop():
+    """Flush queued jobs and stop the writer thread."""
+    global _writer
+    if _writer is not None:
+        _jobs.put(_STOP)
+        _writer.join()
+        _writer = None
+        # Leave a clean queue for a later start()
+        while not _jobs.empty():
+            job = _jobs.get_nowait()
+            if job is not _STOP:
+                _commit([job])
+
+
+async def submit(fn, *args, wait=False):
+    """Run ``fn(cur, *args)`` in the next group commit; returns its result once durable.
+
+    ``wait=True`` waits even with WRITE_DURABILITY=async, for callers that need the result.
+    """
+    start()
+    if WRITE_DURABILITY == "async" and not wait:
+        _jobs.put((fn, args, None, None, time.perf_counter()))
+        return None
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    _jobs.put((fn, args, loop, fut, time.perf_counter()))
+    return await fut
+
+
+def write_direct(fn, *args):
+    """The per-request path: ``fn(cur, *args)`` in its own transaction and commit."""
+    with db.connection() as conn:
+        _synchronous(conn)
+        result = fn(conn.cursor(), *args)
+        conn.commit()
+    return result
+
+
+async def write(fn, *args, wait=False):
+    """Group-commit ``fn(cur, *args)`` when WRITE_QUEUE=1, else commit it on the threadpool."""
+    if WRITE_QUEUE:
+        return await submit(fn, *args, wait=wait)
+    return await run_in_threadpool(write_direct, fn, *args)
+
+
+def snapshot():
+    return dict(stats, queue_depth=_jobs.qsize(), durability=WRITE_DURABILITY)